@@ -0,0 +1,395 @@
+"""Async entry point: the same app served on an event loop.
+
+    WEB_CONCURRENCY=2 uvicorn asgi:app --port 5000
+
+(uvicorn reads its worker count from WEB_CONCURRENCY, which server.py also
+uses to pick a rate limit backend the workers share.)
+
+The I/O-bound hot paths (/messages, /fetch/media, /block_user/<token>,
+/admin/messages and React serving) are native Quart handlers on Motor. Every
+other route is handed to the Flask app in server.py through a WSGI bridge,
+which runs it on a thread pool, so the admin API (uploads, Cloudinary,
+Pillow, bulk operations) keeps working unchanged and off the event loop.
+
+Sessions and block links stay compatible: both apps sign cookies with the
+same SECRET_KEY and the block tokens come from server.py's serializer.
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure
+from quart import Quart, Response, request, send_file, session
+from werkzeug.exceptions import NotFound, MethodNotAllowed
+
+import server
+import stats
+from db import DatabaseUnavailable
+from rate_limit import MongoBackend
+from static_assets import negotiate
+
+quart_app = Quart(__name__, static_folder=None)
+quart_app.secret_key = server.app.secret_key
+
+motor_client = None
+
+
+def get_db():
+    """Motor binds to the running loop, so the client is built on first use."""
+    global motor_client
+    if motor_client is None:
+        motor_client = AsyncIOMotorClient(
+            os.getenv("MONGO_URI"),
+            maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+            serverSelectionTimeoutMS=int(os.getenv("MONGO_SELECT_TIMEOUT_MS", 2000)),
+            connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 2000)),
+            socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000))
+        )
+    return motor_client.get_default_database()
+
+
+async def run_sync(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def require_admin_login():
+    return session.get("admin_logged_in") is True
+
+
+async def get_collection_state(name):
+    """Async twin of server.get_collection_state, sharing its local cache."""
+    now = time.monotonic()
+    with server.versions_lock:
+        cached = server.collection_versions.get(name)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    doc = await get_db().counters.find_one({"_id": name}) or {}
+    version, modified_at = doc.get("version", 0), doc.get("modified_at")
+
+    with server.versions_lock:
+        server.collection_versions[name] = (now + server.VERSION_REFRESH, version, modified_at)
+    return version, modified_at
+
+
+async def bump_collection_version(name):
+    """Async twin of server.bump_collection_version."""
+    doc = await get_db().counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$set": {"modified_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    with server.versions_lock:
+        server.collection_versions[name] = (time.monotonic() + server.VERSION_REFRESH, doc["version"], doc["modified_at"])
+    if name == "media":
+        server.media_cache.clear()
+    return doc["version"]
+
+
+async def conditional_list(collection, cache_control):
+    """Async twin of server.conditional_list."""
+    version, modified_at = await get_collection_state(collection)
+    headers = server.list_validators(collection, version, modified_at, cache_control)
+    if server.is_not_modified(headers, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")):
+        return version, headers, Response("", status=304, headers=headers)
+    return version, headers, None
+
+
+async def is_rate_limited(ip):
+    # The in-memory limiter is a few dict operations, only Mongo needs a thread
+    if isinstance(server.rate_limiter.backend, MongoBackend):
+        return await run_sync(server.is_rate_limited, ip)
+    return server.is_rate_limited(ip)
+
+
+@quart_app.before_request
+async def start_timer():
+    request.start_time = time.perf_counter()
+
+
+@quart_app.after_request
+async def record_latency(response):
+    # Same default as flask-cors in server.py
+    response.headers.setdefault("Access-Control-Allow-Origin", "*")
+
+    start = getattr(request, "start_time", None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        server.metrics.REQUEST_LATENCY.labels(endpoint, request.method, response.status_code).observe(
+            time.perf_counter() - start
+        )
+    return response
+
+
+@quart_app.errorhandler(DatabaseUnavailable)
+async def database_unavailable(e):
+    return {"message": "Can't connect to database, please refresh"}, 503, {"Retry-After": str(e.retry_after)}
+
+
+@quart_app.errorhandler(ConnectionFailure)
+async def database_connection_failed(e):
+    server.db_manager.record_failure(e)
+    print(f"⚠️ MongoDB request failed: {e}")
+    return {"message": "Can't connect to database, please refresh"}, 503, {"Retry-After": "1"}
+
+#-------------------------------------------------------
+#----------- Public Routes -----------------------
+#-------------------------------------------------------
+
+@quart_app.route("/messages", methods=["POST"])
+async def messages():
+    server.check_db()
+    data = await request.get_json()
+    db = get_db()
+
+    email = data.get("email")
+    name = data.get("name")
+    message_content = data.get("description")
+
+    if not email or not message_content:
+        return {"message": "Email and Message are required."}, 400
+
+    if not re.match(server.EMAIL_REGEX, data["email"].lower()):
+        return {"message": "Invalid email format."}, 400
+
+    ip = server.client_ip(request.headers, request.remote_addr)
+    if await is_rate_limited(ip):
+        return {"message": "Too many messages sent. Please try again later."}, 429
+
+    by_status = {}
+    async for r in db.message.find(
+        {"email": email, "status": {"$in": ["blocked", "pending", "responded"]}},
+        server.STATUS_LOOKUP_PROJECTION
+    ):
+        by_status.setdefault(r["status"], r)
+
+    if "blocked" in by_status:
+        return {"message": "You have blocked emails from us. No message sent."}, 403
+
+    if "pending" in by_status:
+        return {"message": "You have a pending message. Please wait for a response."}, 400
+
+    status_type = "NEW"
+
+    if "responded" in by_status:
+        responded = by_status["responded"]
+        updated = await db.message.find_one_and_update(
+            server.thread_append_filter(responded),
+            server.append_thread_update(message_content, datetime.utcnow(), server.legacy_entries(responded)),
+            projection={"_id": 1}
+        )
+        if updated is None:
+            return {"message": "You have a pending message. Please wait for a response."}, 400
+        await stats.apply_async(db, stats.message_moved("responded", "pending"))
+        await bump_collection_version("message")
+        status_type = "RESPONDED"
+    else:
+        result = await db.message.update_one(
+            {"email": email, "status": "pending"},
+            {"$setOnInsert": server.new_thread_fields(name, message_content, ip, datetime.utcnow())},
+            upsert=True
+        )
+        if result.upserted_id is None:
+            return {"message": "You have a pending message. Please wait for a response."}, 400
+        await stats.apply_async(db, stats.message_added("pending"))
+        await bump_collection_version("message")
+
+    return server.submission_response(email, name, message_content, status_type, request.host_url), 200
+
+
+@quart_app.route("/block_user/<token>", methods=["GET"])
+async def block_user(token):
+    email = server.verify_block_token(token)
+    if not email:
+        return "Invalid or expired link. Please try sending a new message to get a fresh link.", 400
+
+    db = get_db()
+    deltas = Counter()
+    for status, query in server.block_queries(email):
+        result = await db.message.update_many(query, {"$set": {"status": "blocked"}})
+        deltas.update(stats.message_moved(status, "blocked", result.modified_count))
+
+    if await db.message.count_documents({"email": email}) == 0:
+        await db.message.insert_one({"email": email, "status": "blocked"})
+        deltas.update(stats.message_added("blocked"))
+
+    await stats.apply_async(db, deltas)
+    if any(deltas.values()):
+        await bump_collection_version("message")
+
+    return await run_sync(server.get_template_content, "block_success.html")
+
+
+@quart_app.route("/fetch/media", methods=["GET"])
+async def fetch_media():
+    server.check_db()
+    page = int(request.args.get("page", 1))
+    limit = int(request.args.get("limit", 10))
+    media_type = request.args.get("type", "all")
+    after = request.args.get("after")
+
+    after_filter = server.media_after_filter(after) if after else None
+    if after and after_filter is None:
+        return {"message": "Invalid cursor"}, 400
+
+    version, validators, not_modified = await conditional_list("media", "public, no-cache")
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = (media_type, after or page, limit, version)
+    cached = server.media_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, headers=validators, mimetype="application/json")
+
+    query = {}
+    if media_type != "all":
+        query["file_type"] = media_type
+
+    skip = 0
+    if after:
+        query.update(after_filter)
+    else:
+        skip = (page - 1) * limit
+
+    docs = await get_db().media.find(query, server.MEDIA_LIST_PROJECTION).sort("_id", -1).skip(skip).limit(limit).to_list(limit)
+    media = [server.media_row(m) for m in docs]
+
+    next_cursor = None
+    if docs and len(media) == limit:
+        next_cursor = server.media_next_cursor(docs[-1])
+
+    body = server.serialize.dumps({
+        "page": page,
+        "limit": limit,
+        "count": len(media),
+        "data": media,
+        "next_cursor": next_cursor
+    })
+    server.media_cache.set(cache_key, body)
+
+    return Response(body, headers=validators, mimetype="application/json")
+
+#-------------------------------------------------------
+#----------- Admin Routes -----------------------
+#-------------------------------------------------------
+
+@quart_app.route("/admin/messages", methods=["GET"])
+async def get_messages():
+    server.check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    page = int(request.args.get("page", 1))
+    limit = int(request.args.get("limit", 10))
+    after = request.args.get("after")
+
+    after_filter = server.messages_after_filter(after) if after else None
+    if after and after_filter is None:
+        return {"message": "Invalid cursor"}, 400
+
+    _, validators, not_modified = await conditional_list("message", "private, no-cache")
+    if not_modified is not None:
+        return not_modified
+
+    query = {}
+    skip = 0
+    if after:
+        query = after_filter
+    else:
+        skip = (page - 1) * limit
+
+    docs = await get_db().message.find(query, server.MESSAGE_LIST_PROJECTION) \
+        .sort([("created_at", -1), ("_id", -1)]) \
+        .skip(skip) \
+        .limit(limit) \
+        .to_list(limit)
+    messages = [server.message_row(m) for m in docs]
+
+    next_cursor = None
+    if docs and len(messages) == limit:
+        next_cursor = server.messages_next_cursor(docs[-1])
+
+    body = server.serialize.dumps({
+        "page": page,
+        "limit": limit,
+        "count": len(messages),
+        "data": messages,
+        "next_cursor": next_cursor
+    })
+    return Response(body, headers=validators, mimetype="application/json")
+
+#-------------------------------------------------------
+#----------- React Serving Route -----------------------
+#-------------------------------------------------------
+
+async def serve_asset(asset):
+    status, headers, data, path = negotiate(
+        asset,
+        request.headers.get("Accept-Encoding"),
+        request.headers.get("If-None-Match")
+    )
+
+    if status == 304:
+        return Response("", status=304, headers=headers)
+
+    if data is not None:
+        response = Response(data, mimetype=asset.mimetype)
+    else:
+        response = await send_file(path, mimetype=asset.mimetype)
+
+    response.headers.update(headers)
+    return response
+
+
+@quart_app.route("/", defaults={"path": ""})
+@quart_app.route("/<path:path>")
+async def serve_react(path):
+    # Only reached for manifest entries and the index.html fallback, see handled_natively
+    asset = server.static_manifest.get(path) if path else None
+    if asset is None:
+        asset = server.static_manifest["index.html"]
+    return await serve_asset(asset)
+
+#-------------------------------------------------------
+#----------- Dispatch -----------------------
+#-------------------------------------------------------
+
+flask_app = WSGIMiddleware(server.app, workers=int(os.getenv("WSGI_THREADS", 10)))
+flask_urls = server.app.url_map.bind("localhost")
+
+
+def handled_natively(path, method):
+    """True when Flask would route the request to an endpoint Quart also implements."""
+    try:
+        endpoint, args = flask_urls.match(path, method)
+    except (NotFound, MethodNotAllowed):
+        return False
+
+    if endpoint == "serve_react":
+        # Files added after startup aren't in the manifest, Flask serves those from disk
+        rel_path = args.get("path", "")
+        if rel_path in server.static_manifest:
+            return True
+        full_path = os.path.join(server.app.template_folder, rel_path)
+        return "index.html" in server.static_manifest and not (rel_path and os.path.isfile(full_path))
+
+    return endpoint in quart_app.view_functions
+
+
+async def app(scope, receive, send):
+    # CORS preflights are answered by flask-cors
+    if scope["type"] == "http" and (
+        scope["method"] == "OPTIONS" or not handled_natively(scope["path"], scope["method"])
+    ):
+        await flask_app(scope, receive, send)
+        return
+    await quart_app(scope, receive, send)
@@ -0,0 +1,95 @@
+"""Content-addressed reuse of Cloudinary uploads.
+
+Media documents carry the SHA-256 of what was uploaded for them:
+
+    "hashes":        [raw upload, optimized WebP]   # the main asset
+    "poster_hashes": [raw poster, optimized WebP]   # video posters
+
+The upload paths look the raw hash up before optimizing, and the optimized
+hash before pushing to Cloudinary (a re-exported copy of a photo often
+encodes to the same WebP). A match reuses the existing secure_url/public_id
+instead of storing another copy.
+
+Remote assets can be shared from then on, so they are reference counted by
+the media documents themselves: after a document is deleted (or its poster
+replaced), `unreferenced` tells which of its public_ids no other document
+uses, and only those are destroyed. An upload that matches a document being
+deleted at that very moment can end up pointing at a destroyed asset;
+uploading it again fixes that.
+"""
+
+import hashlib
+import os
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_hash(file):
+    """SHA-256 of a path or a seekable stream; streams are left where they were."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    position = file.tell()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+        digest.update(chunk)
+    file.seek(position)
+    return digest.hexdigest()
+
+
+def bytes_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def merge(*hash_lists):
+    """Concatenates hash lists, dropping duplicates and keeping the order."""
+    return list(dict.fromkeys(h for hashes in hash_lists for h in hashes if h))
+
+
+def find_main(collection, hashes, file_type):
+    """A media document whose main asset (and variants) matches one of `hashes`."""
+    return collection.find_one(
+        {"hashes": {"$in": hashes}, "file_type": file_type},
+        {"url": 1, "id": 1, "variants": 1, "hashes": 1}
+    )
+
+
+def find_poster(collection, hashes):
+    """A media document whose poster matches one of `hashes`."""
+    return collection.find_one(
+        {"poster_hashes": {"$in": hashes}, "poster_id": {"$nin": ["", None]}},
+        {"poster_url": 1, "poster_id": 1, "poster_hashes": 1}
+    )
+
+
+def remote_assets(media):
+    """[(public_id, Cloudinary resource type)] a media document points at."""
+    main_type = "video" if media["file_type"] == "video" else "image"
+    found = [(media["id"], main_type)]
+    # The widest variant is media["id"] itself
+    found += [(v["id"], "image") for v in media.get("variants", []) if v["id"] != media["id"]]
+    if media.get("poster_id"):
+        found.append((media["poster_id"], "image"))
+    return found
+
+
+def unreferenced(collection, public_ids):
+    """The subset of `public_ids` that no media document uses any more."""
+    public_ids = {public_id for public_id in public_ids if public_id}
+    if not public_ids:
+        return set()
+
+    ids = list(public_ids)
+    used = set()
+    for doc in collection.find(
+        {"$or": [{"id": {"$in": ids}}, {"variants.id": {"$in": ids}}, {"poster_id": {"$in": ids}}]},
+        {"id": 1, "variants.id": 1, "poster_id": 1}
+    ):
+        used.add(doc.get("id"))
+        used.add(doc.get("poster_id"))
+        used.update(v.get("id") for v in doc.get("variants", []))
+    return public_ids - used
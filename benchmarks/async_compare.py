@@ -0,0 +1,159 @@
+"""Side-by-side throughput of the sync (gunicorn + server:app) and async
+(uvicorn + asgi:app) entry points.
+
+Both servers are started against the same MONGO_URI with the same number of
+workers, then hammered with concurrent keep-alive clients per route. Point
+MONGO_URI at a local/dev database with some media and messages in it.
+
+The media response cache is off (MEDIA_CACHE_SIZE=0) unless --cache is
+given: with it every request after the first is a dict lookup in either
+server and the run measures HTTP overhead, not the Mongo path that differs.
+
+    MONGO_URI=mongodb://localhost:27017/portfolio python benchmarks/async_compare.py
+    MONGO_URI=... python benchmarks/async_compare.py --update   # record a new baseline
+"""
+
+import argparse
+import http.client
+import math
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import ROOT, record_or_compare
+
+ROUTES = ("/fetch/media?limit=10", "/fetch/media?type=photo&limit=10", "/")
+
+SERVERS = {
+    "sync (gunicorn)": lambda port, workers, threads: [
+        sys.executable, "-m", "gunicorn", "server:app", "-w", str(workers),
+        "--threads", str(threads), "-b", f"127.0.0.1:{port}"
+    ],
+    "async (uvicorn)": lambda port, workers, threads: [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ],
+}
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health/live")
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def load(port, path, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    errors[0] += 1
+            except OSError:
+                errors[0] += 1
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[math.ceil(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=5090)
+    parser.add_argument("--cache", action="store_true", help="keep the media response cache on")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--floor-ms", type=float, default=2.0,
+                        help="ignore regressions smaller than this, sub-ms latencies are mostly noise")
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    if not os.getenv("MONGO_URI"):
+        print("Set MONGO_URI to a local Mongo with test data")
+        return 1
+
+    env = dict(
+        os.environ,
+        SECRET_KEY=os.getenv("SECRET_KEY", "benchmark"),
+        WEB_CONCURRENCY=str(args.workers),
+        AUTO_INDEXES="0",
+        UPLOAD_RECOVERY="0",
+    )
+    if not args.cache:
+        env["MEDIA_CACHE_SIZE"] = "0"
+    results = {}
+    for name, command in SERVERS.items():
+        proc = subprocess.Popen(
+            command(args.port, args.workers, args.threads),
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_until_up(args.port):
+                print(f"{name} did not start")
+                return 1
+            for path in ROUTES:
+                load(args.port, path, args.concurrency, 1)   # warm up caches and pools
+                results[(name, path)] = load(args.port, path, args.concurrency, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{'server':<17} {'route':<34} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for (name, path), r in results.items():
+        print(f"{name:<17} {path:<34} {r['rps']:>9.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}")
+
+    failed = any(r["errors"] for r in results.values())
+    for name in SERVERS:
+        current = {}
+        for path in ROUTES:
+            r = results[(name, path)]
+            current[f"{path}.p50_ms"] = round(r["p50_ms"], 2)
+            current[f"{path}.p99_ms"] = round(r["p99_ms"], 2)
+        kind = name.split()[0]
+        cache = "cached" if args.cache else "uncached"
+        print(f"\n{name}")
+        failed = record_or_compare(
+            f"async_compare_{kind}_{cache}", current, args.update, args.tolerance, args.floor_ms
+        ) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Shared helpers for the benchmark scripts: baseline storage and checks."""
+
+import json
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baselines.json")
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    with open(BASELINE_FILE, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def record_or_compare(name, current, update, tolerance, floor=0):
+    """Stores `current` as the baseline for `name`, or compares against it.
+
+    Every metric is "lower is better". Returns True when something regressed
+    by more than `tolerance` (0.25 = 25%) and by more than `floor` in absolute
+    terms, so noise on tiny values (sub-ms latencies) doesn't count.
+    """
+    baselines = load_baselines()
+    if update:
+        baselines[name] = current
+        save_baselines(baselines)
+        print(f"Baseline '{name}' written to {BASELINE_FILE}")
+        return False
+
+    baseline = baselines.get(name)
+    if baseline is None:
+        print(f"No '{name}' baseline yet, run with --update")
+        return False
+
+    failed = False
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        limit = max(baseline[key] * (1 + tolerance), baseline[key] + floor)
+        status = "ok" if value <= limit else "REGRESSED"
+        print(f"{key:<14}: {value} (baseline {baseline[key]}, limit {limit:.4g}) {status}")
+        failed = failed or value > limit
+    return failed
@@ -0,0 +1,103 @@
+"""Peak memory per photo upload.
+
+Writes a large synthetic JPEG, then runs images.optimize_image on it in a
+fresh interpreter and reports the peak RSS and wall time of that process.
+The "naive" mode replays the old full-resolution decode for comparison.
+
+    python benchmarks/image_decode.py                 # compare against the baseline
+    python benchmarks/image_decode.py --update        # record a new baseline
+    python benchmarks/image_decode.py --megapixels 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT, record_or_compare
+
+CHILD = r"""
+import json, sys, time
+mode, path = sys.argv[1], sys.argv[2]
+
+from PIL import Image
+import images
+
+start = time.perf_counter()
+with open(path, "rb") as f:
+    if mode == "naive":
+        img = Image.open(f)
+        img.load()
+        img = img.convert("RGB")
+        img.thumbnail((images.MAX_SIDE, images.MAX_SIDE), Image.LANCZOS, reducing_gap=None)
+        out = images.encode_webp(img)
+    else:
+        out = images.optimize_image(f).getvalue()
+elapsed = time.perf_counter() - start
+
+# VmHWM resets on exec, unlike ru_maxrss which inherits the parent's peak
+peak_kb = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmHWM:"):
+            peak_kb = int(line.split()[1])
+
+print(json.dumps({
+    "peak_rss_mb": peak_kb / 1024,
+    "seconds": elapsed,
+    "output_kb": len(out) / 1024
+}))
+"""
+
+
+def make_jpeg(path, megapixels):
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    # A gradient keeps the file realistic in size without shipping a fixture
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img.save(path, "JPEG", quality=90)
+    return width, height
+
+
+def run(mode, path):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, path],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "upload.jpg")
+        width, height = make_jpeg(path, args.megapixels)
+        print(f"source: {width}x{height} JPEG, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        naive = run("naive", path)
+        current = run("draft", path)
+
+    for name, r in (("full decode", naive), ("draft decode", current)):
+        print(f"{name:<13}: peak RSS {r['peak_rss_mb']:.1f} MB, "
+              f"{r['seconds'] * 1000:.0f} ms, output {r['output_kb']:.0f} KB")
+
+    failed = record_or_compare(
+        f"image_decode_{args.megapixels:g}mp",
+        {"peak_rss_mb": round(current["peak_rss_mb"], 1)},
+        args.update,
+        args.tolerance
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
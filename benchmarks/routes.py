@@ -0,0 +1,569 @@
+"""Route-level latency and throughput for server.py.
+
+Seeds a database, swaps Cloudinary for an in-process fake and drives every
+hot route twice: through Flask's test client (framework + app cost only) and
+over real HTTP against a threaded werkzeug server. Reports req/s, p50 and
+p99 per case and compares p50/p99 against the stored baselines.
+
+Runs on mongomock by default, so the numbers track the app's own overhead.
+Pass --mongo-uri to measure against a real local Mongo; the database in the
+URI is dropped afterwards, so point it at a scratch one.
+
+    python benchmarks/routes.py                       # compare against the baseline
+    python benchmarks/routes.py --update              # record a new baseline
+    python benchmarks/routes.py --only fetch_media --sizes 100 10000
+    python benchmarks/routes.py --mongo-uri mongodb://localhost:27017/portfolio_bench
+"""
+
+import argparse
+import http.client
+import io
+import itertools
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from common import ROOT, record_or_compare
+
+ADMIN = {"email": "admin@bench.test", "password": "bench"}
+
+
+def configure_env(args, spool_dir):
+    """server.py reads its configuration at import time."""
+    os.environ.update({
+        "MONGO_URI": args.mongo_uri or "mongodb://127.0.0.1:1/portfolio_bench",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "benchmark"),
+        "ADMIN_EMAIL": ADMIN["email"],
+        "ADMIN_PASSWORD": ADMIN["password"],
+        "RATE_LIMIT_MESSAGES": "1000000000/1",
+        "RATE_LIMIT_BACKEND": "memory",
+        "WEB_CONCURRENCY": "1",
+        "UPLOAD_SPOOL_DIR": spool_dir,
+        "AUTO_INDEXES": "0",
+        "UPLOAD_RECOVERY": "0",
+    })
+
+
+class FakeCloudinary:
+    """Stands in for the cloudinary package: reads the upload fully, then
+    answers after a fixed delay, like a fast CDN round trip."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.counter = itertools.count()
+        self.uploader = self.api = self.utils = self
+
+    def upload(self, file, **options):
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                f.read()
+        else:
+            file.read()
+        time.sleep(self.latency)
+        n = next(self.counter)
+        return {"public_id": f"bench/{n}", "secure_url": f"https://res.example.com/bench/{n}.webp"}
+
+    def destroy(self, public_id, **options):
+        return {"result": "ok"}
+
+    def delete_resources(self, public_ids, **options):
+        return {"deleted": {public_id: "deleted" for public_id in public_ids}}
+
+    def api_sign_request(self, params, secret):
+        return "0" * 40
+
+
+def load_server(args):
+    # server.py resolves frontend/build and the spool dir relative to the cwd
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import server
+
+    if not args.mongo_uri:
+        import mongomock
+
+        class FakeMongo:
+            def __init__(self):
+                self.cx = mongomock.MongoClient()
+                self.db = self.cx.portfolio_bench
+
+        server.mongo = server.db_manager.mongo = FakeMongo()
+    else:
+        server.provision_indexes()
+
+    # Keeps the probe's first (pre-patch) ping from tripping the breaker
+    server.db_manager.check = lambda: None
+
+    fake = FakeCloudinary(args.cloudinary_ms / 1000)
+    server.load_cloudinary = lambda: fake
+    return server
+
+#-------------------------------------------------------
+#----------- Drivers -----------------------
+#-------------------------------------------------------
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, mimetype) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {mimetype}\r\n\r\n".encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class TestClientDriver:
+    name = "test_client"
+
+    def __init__(self, server):
+        self.client = server.app.test_client()
+
+    def request(self, method, path, json_body=None, fields=None, files=None, headers=None):
+        kwargs = {"headers": headers or {}}
+        if json_body is not None:
+            kwargs["json"] = json_body
+        if fields is not None:
+            data = dict(fields)
+            for name, (filename, content, mimetype) in (files or {}).items():
+                data[name] = (io.BytesIO(content), filename, mimetype)
+            kwargs["data"] = data
+            kwargs["content_type"] = "multipart/form-data"
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    name = "http"
+
+    def __init__(self, server):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.httpd = make_server("127.0.0.1", 0, server.app, threaded=True, request_handler=QuietHandler)
+        self.port = self.httpd.server_port
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+        self.cookie = None
+
+    def connection(self):
+        if not hasattr(self.local, "conn"):
+            self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        return self.local.conn
+
+    def request(self, method, path, json_body=None, fields=None, files=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif fields is not None:
+            body, headers["Content-Type"] = multipart(fields, files or {})
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+
+        conn = self.connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        data = response.read()
+
+        set_cookie = response.getheader("Set-Cookie")
+        if set_cookie:
+            self.cookie = set_cookie.split(";", 1)[0]
+        return response.status, data
+
+    def close(self):
+        self.httpd.shutdown()
+
+#-------------------------------------------------------
+#----------- Cases -----------------------
+#-------------------------------------------------------
+
+
+def message_body(email):
+    return {"email": email, "name": "Bench", "description": "Hello, I'd like to talk about a project."}
+
+
+def seed_media(db, size):
+    db.media.delete_many({})
+    db.media.insert_many([
+        {"title": f"Project {i}", "file_type": "photo" if i % 3 else "video",
+         "description": "A portfolio piece used for benchmarking.",
+         "skills": ["React", "Flask"] if i % 2 else ["Python"],
+         "url": f"https://res.example.com/{i}.webp", "id": f"bench/m{i}",
+         "poster_url": "", "poster_id": "", "created_at": datetime.utcnow()}
+        for i in range(size)
+    ])
+
+
+def seed_messages(db, count):
+    db.message.delete_many({})
+    start = datetime.utcnow()
+    db.message.insert_many([
+        {"email": f"seed{i}@bench.test", "name": "Seed", "status": "pending",
+         "message": "Seeded message", "preview": "Seeded message", "entry_count": 1,
+         "ip": "127.0.0.1", "created_at": start - timedelta(seconds=i)}
+        for i in range(count)
+    ])
+
+
+class Case:
+    """One benchmarked request shape. `build(i)` returns request kwargs for
+    the i-th request; `expect` is the status every response should have."""
+
+    def __init__(self, name, build, expect=200, setup=None, teardown=None):
+        self.name = name
+        self.build = build
+        self.expect = expect
+        self.setup = setup
+        self.teardown = teardown
+
+
+def message_cases(server, requests):
+    db = server.mongo.db
+    run = {}
+
+    def seed_pending():
+        db.message.insert_one({"email": "pending@bench.test", "status": "pending",
+                               "created_at": datetime.utcnow()})
+
+    def seed_blocked():
+        db.message.insert_one({"email": "blocked@bench.test", "status": "blocked"})
+
+    def seed_responded():
+        # One responded thread per request, each request re-opens its own
+        run["id"] = uuid.uuid4().hex[:8]
+        db.message.insert_many([
+            {"email": f"responded{i}-{run['id']}@bench.test", "name": "Bench", "status": "responded",
+             "message": "First message", "preview": "First message", "entry_count": 1,
+             "entries": [{"text": "First message", "created_at": datetime.utcnow()}],
+             "ip": "127.0.0.1", "created_at": datetime.utcnow()}
+            for i in range(requests)
+        ])
+
+    return [
+        Case("messages.new",
+             lambda i: {"method": "POST", "path": "/messages",
+                        "json_body": message_body(f"new-{uuid.uuid4().hex}@bench.test")}),
+        Case("messages.pending",
+             lambda i: {"method": "POST", "path": "/messages",
+                        "json_body": message_body("pending@bench.test")},
+             expect=400, setup=seed_pending),
+        Case("messages.responded",
+             lambda i: {"method": "POST", "path": "/messages",
+                        "json_body": message_body(f"responded{i}-{run['id']}@bench.test")},
+             setup=seed_responded),
+        Case("messages.blocked",
+             lambda i: {"method": "POST", "path": "/messages",
+                        "json_body": message_body("blocked@bench.test")},
+             expect=403, setup=seed_blocked),
+    ]
+
+
+def fetch_media_cases(server, sizes, depths, limit=10):
+    db = server.mongo.db
+    cases = []
+
+    def uncached():
+        # max_size=0 drops every entry on insert, so each request hits Mongo
+        server.media_cache = server.ResponseCache(max_size=0)
+
+    def restore(cache=server.media_cache):
+        server.media_cache = cache
+
+    for size in sizes:
+        def seed(size=size):
+            seed_media(db, size)
+            server.bump_collection_version("media")
+
+        cases.append(Case(
+            f"fetch_media.{size}.cached",
+            lambda i: {"method": "GET", "path": f"/fetch/media?limit={limit}"},
+            setup=seed
+        ))
+        for page in depths:
+            if (page - 1) * limit >= size:
+                continue
+            cases.append(Case(
+                f"fetch_media.{size}.page{page}",
+                lambda i, page=page: {"method": "GET", "path": f"/fetch/media?page={page}&limit={limit}"},
+                setup=uncached, teardown=restore
+            ))
+            if page == 1:
+                continue
+
+            def keyset(page, state):
+                uncached()
+                docs = list(db.media.find({}, {"_id": 1}).sort("_id", -1).skip((page - 1) * limit - 1).limit(1))
+                state["after"] = server.media_next_cursor(docs[0])
+
+            state = {}
+            cases.append(Case(
+                f"fetch_media.{size}.after{page}",
+                lambda i, state=state: {"method": "GET",
+                                        "path": f"/fetch/media?limit={limit}&after={state['after']}"},
+                setup=lambda page=page, state=state: keyset(page, state), teardown=restore
+            ))
+    return cases
+
+
+def admin_message_cases(server, count, limit=10):
+    db = server.mongo.db
+    state = {}
+
+    def seed():
+        seed_messages(db, count)
+        last = list(db.message.find({}).sort([("created_at", -1), ("_id", -1)]).skip(count // 2 - 1).limit(1))
+        state["after"] = server.messages_next_cursor(last[0])
+
+    return [
+        Case("admin_messages.page1",
+             lambda i: {"method": "GET", "path": f"/admin/messages?limit={limit}"}, setup=seed),
+        Case(f"admin_messages.page{count // 2 // limit + 1}",
+             lambda i: {"method": "GET", "path": f"/admin/messages?page={count // 2 // limit + 1}&limit={limit}"}),
+        Case("admin_messages.after",
+             lambda i: {"method": "GET", "path": f"/admin/messages?limit={limit}&after={state['after']}"}),
+    ]
+
+
+def react_cases(server):
+    manifest = server.static_manifest
+    if "index.html" not in manifest:
+        print("frontend/build is missing, skipping serve_react")
+        return []
+
+    cases = [Case("serve_react.index", lambda i: {"method": "GET", "path": "/"})]
+    bundle = next((p for p in manifest if p.startswith("static/js/main.") and p.endswith(".js")), None)
+    if bundle:
+        etag = manifest[bundle].etag
+        cases += [
+            Case("serve_react.bundle_gzip",
+                 lambda i: {"method": "GET", "path": f"/{bundle}", "headers": {"Accept-Encoding": "gzip"}}),
+            Case("serve_react.bundle_304",
+                 lambda i: {"method": "GET", "path": f"/{bundle}", "headers": {"If-None-Match": f'"{etag}"'}},
+                 expect=304),
+        ]
+    cases.append(Case("serve_react.spa_route", lambda i: {"method": "GET", "path": "/projects/some-project"}))
+    return cases
+
+#-------------------------------------------------------
+#----------- Runner -----------------------
+#-------------------------------------------------------
+
+
+def summarize(latencies, elapsed, errors):
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[math.ceil(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+        "errors": errors,
+    }
+
+
+def run_case(driver, case, requests, concurrency):
+    if case.setup:
+        case.setup()
+
+    counter = itertools.count()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        while True:
+            i = next(counter)
+            if i >= requests:
+                break
+            start = time.perf_counter()
+            status, _ = driver.request(**case.build(i))
+            local.append(time.perf_counter() - start)
+            if status != case.expect:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    if case.teardown:
+        case.teardown()
+    return summarize(latencies, elapsed, errors[0])
+
+
+def make_jpegs(megapixels, count):
+    """`count` different photos; identical ones would hit the upload dedup."""
+    from PIL import Image, ImageFilter
+
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    # Noise on a gradient compresses like a photo instead of like a flat fill
+    noise = Image.effect_noise((width, height), 40).filter(ImageFilter.GaussianBlur(1))
+    img = Image.merge("RGB", (Image.linear_gradient("L").resize((width, height)), noise, noise))
+    jpegs = []
+    for i in range(count):
+        img.paste((i * 37 % 256, 0, 0), (0, 0, 64, 64))
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=90)
+        jpegs.append(buffer.getvalue())
+    return jpegs
+
+
+def run_uploads(server, driver, jpegs, name="admin_upload"):
+    """Uploads one at a time: the 202 latency and the time until the job is done."""
+    accepted, completed = [], []
+    errors = 0
+    started = time.perf_counter()
+    for i, jpeg in enumerate(jpegs):
+        start = time.perf_counter()
+        status, body = driver.request(
+            "POST", "/admin/upload",
+            fields={"type": "photo", "title": f"Upload {i}", "description": "Benchmark upload",
+                    "skills": "React, Flask"},
+            files={"file": ("photo.jpg", jpeg, "image/jpeg")}
+        )
+        accepted.append(time.perf_counter() - start)
+        if status != 202:
+            errors += 1
+            continue
+
+        job_id = json.loads(body)["job_id"]
+        while True:
+            job = server.upload_jobs.status(job_id)
+            if job and job["status"] in ("done", "failed"):
+                break
+            time.sleep(0.005)
+        completed.append(time.perf_counter() - start)
+        if job["status"] != "done":
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        f"{name}.accept": summarize(accepted, elapsed, errors),
+        f"{name}.complete": summarize(completed, elapsed, errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-uri", help="real Mongo scratch database instead of mongomock")
+    parser.add_argument("--drivers", nargs="+", default=["test_client", "http"], choices=["test_client", "http"])
+    parser.add_argument("--only", nargs="+", help="case name prefixes to run")
+    parser.add_argument("--requests", type=int, default=200, help="requests per case")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads for the http driver (real Mongo only)")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="media collection sizes (default 100 1000, plus 10000 on real Mongo)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 50], help="media page depths")
+    parser.add_argument("--messages", type=int, default=1000, help="seeded messages for /admin/messages")
+    parser.add_argument("--uploads", type=int, default=5, help="photo uploads per driver")
+    parser.add_argument("--megapixels", type=float, default=12, help="size of the uploaded JPEG")
+    parser.add_argument("--cloudinary-ms", type=float, default=20, help="fake Cloudinary round trip")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--floor-ms", type=float, default=2.0,
+                        help="ignore regressions smaller than this, sub-ms latencies are mostly noise")
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    if args.sizes is None:
+        args.sizes = [100, 1000, 10000] if args.mongo_uri else [100, 1000]
+
+    spool_dir = tempfile.mkdtemp(prefix="bench-spool-")
+    configure_env(args, spool_dir)
+    server = load_server(args)
+
+    def selected(name):
+        return not args.only or any(name.startswith(prefix) for prefix in args.only)
+
+    cases = [
+        case for case in (
+            message_cases(server, args.requests)
+            + fetch_media_cases(server, args.sizes, args.depths)
+            + admin_message_cases(server, args.messages)
+            + react_cases(server)
+        )
+        if selected(case.name)
+    ]
+    jpegs = make_jpegs(args.megapixels, args.uploads) if selected("admin_upload") and args.uploads else None
+
+    failed = False
+    try:
+        for driver_name in args.drivers:
+            driver = (TestClientDriver if driver_name == "test_client" else HttpDriver)(server)
+            # The test client shares one cookie jar and mongomock isn't thread-safe
+            # (it mutates the projections it is given), so both stay single-threaded
+            concurrency = args.concurrency if driver_name == "http" and args.mongo_uri else 1
+            results = {}
+            try:
+                status, _ = driver.request("POST", "/admin/login", json_body=ADMIN)
+                if status != 200:
+                    print(f"Admin login failed with {status}")
+                    return 1
+
+                for case in cases:
+                    run_case(driver, case, min(20, args.requests), concurrency)   # warm up
+                    results[case.name] = run_case(driver, case, args.requests, concurrency)
+                if jpegs:
+                    # Fresh photos per driver, then the same ones again (content dedup)
+                    server.mongo.db.media.delete_many({"title": {"$regex": "^Upload "}})
+                    results.update(run_uploads(server, driver, jpegs))
+                    results.update(run_uploads(server, driver, jpegs, "admin_upload.duplicate"))
+            finally:
+                driver.close()
+
+            print(f"\n{driver_name} (concurrency {concurrency})")
+            print(f"{'case':<34} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for name, r in results.items():
+                print(f"{name:<34} {r['rps']:>9.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+            current = {}
+            for name, r in results.items():
+                current[f"{name}.p50_ms"] = round(r["p50_ms"], 2)
+                current[f"{name}.p99_ms"] = round(r["p99_ms"], 2)
+                failed = failed or r["errors"] > 0
+
+            backend = "mongo" if args.mongo_uri else "mongomock"
+            failed = record_or_compare(
+                f"routes_{backend}_{driver_name}", current, args.update, args.tolerance, args.floor_ms
+            ) or failed
+    finally:
+        if args.mongo_uri:
+            server.mongo.cx.drop_database(server.mongo.db.name)
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Bytes and CPU per list request: decoding, row building and JSON encoding.
+
+Replays what /fetch/media and /admin/messages do with a page of documents,
+without a server: BSON as Mongo would send it is decoded, turned into rows
+and encoded, in three variants:
+
+    before   full documents, stdlib json / flask_pymongo's json_util encoder
+    after    projected documents, serialize.dumps
+    raw      projected documents decoded as RawBSONDocument, serialize.dumps
+
+    python benchmarks/serialization.py            # compare against the baseline
+    python benchmarks/serialization.py --update   # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.json_util import RELAXED_JSON_OPTIONS, dumps as json_util_dumps
+from bson.raw_bson import RawBSONDocument
+
+from common import ROOT, record_or_compare
+
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/portfolio_bench")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["AUTO_INDEXES"] = "0"
+os.environ["UPLOAD_RECOVERY"] = "0"
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import server  # noqa: E402
+import serialize  # noqa: E402
+
+RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def media_doc(i):
+    return {
+        "_id": ObjectId(),
+        "title": f"Project {i}",
+        "file_type": "photo",
+        "description": "A portfolio piece with a longer description of the stack and the work. " * 4,
+        "skills": ["React", "Flask", "MongoDB", "Three.js", "Tailwind"],
+        "url": f"https://res.cloudinary.com/demo/image/upload/v1/portfolio/{i}_2048.webp",
+        "id": f"portfolio/{i}_2048",
+        "poster_url": "",
+        "poster_id": "",
+        "variants": [
+            {"width": w, "url": f"https://res.cloudinary.com/demo/image/upload/v1/portfolio/{i}_{w}.webp",
+             "id": f"portfolio/{i}_{w}"}
+            for w in (320, 640, 1024, 2048)
+        ],
+        "job_id": ObjectId().binary.hex() + "00000000",
+        "created_at": datetime(2024, 1, 1) + timedelta(hours=i)
+    }
+
+
+def message_doc(i):
+    text = "Hi! I saw your portfolio and would like to discuss a project with you. " * 6
+    doc = {
+        "_id": ObjectId(),
+        "email": f"user{i}@example.com",
+        "name": f"User {i}",
+        "status": "pending",
+        "entry_count": 3,
+        "preview": text[:server.PREVIEW_CHARS],
+        "ip": "203.0.113.7",
+        "created_at": datetime(2024, 1, 1) + timedelta(minutes=i)
+    }
+    # Entries are excluded by both the old and the new list projection
+    return doc
+
+
+def project(doc, projection):
+    """What Mongo returns for an inclusion projection (one level of dotted paths)."""
+    out = {"_id": doc["_id"]}
+    for path in projection:
+        top, _, sub = path.partition(".")
+        if top not in doc:
+            continue
+        if not sub:
+            out[top] = doc[top]
+        else:
+            out[top] = [
+                {**existing, sub: item[sub]}
+                for existing, item in zip(out.get(top, [{}] * len(doc[top])), doc[top])
+            ]
+    return out
+
+
+def encode_batch(docs):
+    return b"".join(bson.encode(d) for d in docs)
+
+
+def media_before(data):
+    rows = [server.media_row(m) for m in bson.decode_all(data)]
+    return json.dumps({"page": 1, "limit": len(rows), "count": len(rows), "data": rows,
+                       "next_cursor": None}).encode("utf-8")
+
+
+def media_after(data, options=None):
+    docs = bson.decode_all(data, options) if options else bson.decode_all(data)
+    rows = [server.media_row(m) for m in docs]
+    return serialize.dumps({"page": 1, "limit": len(rows), "count": len(rows), "data": rows,
+                            "next_cursor": None})
+
+
+def messages_before(data):
+    rows = [server.message_row(m) for m in bson.decode_all(data)]
+    return json_util_dumps({"page": 1, "limit": len(rows), "count": len(rows), "data": rows,
+                            "next_cursor": None}, json_options=RELAXED_JSON_OPTIONS).encode("utf-8")
+
+
+def messages_after(data, options=None):
+    docs = bson.decode_all(data, options) if options else bson.decode_all(data)
+    rows = [server.message_row(m) for m in docs]
+    return serialize.dumps({"page": 1, "limit": len(rows), "count": len(rows), "data": rows,
+                            "next_cursor": None})
+
+
+def cpu_per_call(func, *args, min_time=0.5):
+    iterations = 0
+    start = time.process_time()
+    while True:
+        for _ in range(50):
+            func(*args)
+        iterations += 50
+        elapsed = time.process_time() - start
+        if elapsed >= min_time:
+            return elapsed / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, nargs="+", default=[10, 50], help="rows per page")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    print(f"JSON backend: {'orjson' if serialize.orjson else 'stdlib'}")
+    print(f"{'case':<22} {'variant':<8} {'bson B':>8} {'json B':>8} {'cpu us':>9}")
+
+    current = {}
+    for limit in args.limit:
+        shapes = (
+            ("media", [media_doc(i) for i in range(limit)], server.MEDIA_LIST_PROJECTION,
+             media_before, media_after),
+            ("messages", [message_doc(i) for i in range(limit)], server.MESSAGE_LIST_PROJECTION,
+             messages_before, messages_after),
+        )
+        for name, docs, projection, before, after in shapes:
+            full = encode_batch(docs)
+            projected = encode_batch([project(d, projection) for d in docs])
+            variants = (
+                ("before", full, lambda data: before(data)),
+                ("after", projected, lambda data: after(data)),
+                ("raw", projected, lambda data: after(data, RAW_OPTIONS)),
+            )
+            case = f"{name}.limit{limit}"
+            for variant, data, func in variants:
+                body = func(data)
+                cpu_us = cpu_per_call(func, data) * 1e6
+                print(f"{case:<22} {variant:<8} {len(data):>8} {len(body):>8} {cpu_us:>9.1f}")
+                if variant == "after":
+                    current[f"{case}.cpu_us"] = round(cpu_us, 1)
+                    current[f"{case}.json_bytes"] = len(body)
+                    current[f"{case}.bson_bytes"] = len(data)
+
+    failed = record_or_compare("serialization", current, args.update, args.tolerance)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
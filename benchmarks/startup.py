@@ -0,0 +1,84 @@
+"""Cold-start benchmark for server.py.
+
+Imports the app in fresh interpreters and records wall-clock import time and
+resident memory after boot. Fails (exit code 1) when the median regresses more
+than the allowed tolerance over the stored baseline, or when a module that
+should be lazy (PIL, cloudinary, altair) is loaded during boot.
+
+    python benchmarks/startup.py            # compare against the baseline
+    python benchmarks/startup.py --update   # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT, record_or_compare
+
+LAZY_MODULES = ("PIL", "cloudinary", "altair", "pandas")
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+
+rss_kb = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+
+print(json.dumps({
+    "import_s": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "loaded": [m for m in %r if m in sys.modules]
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_once():
+    env = dict(os.environ)
+    # Creating the Mongo client does not connect, a dummy URI is enough to boot
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017/portfolio")
+    env.setdefault("SECRET_KEY", "benchmark")
+
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed regression over the baseline (0.25 = 25%%)")
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    current = {
+        "import_s": round(statistics.median(r["import_s"] for r in results), 4),
+        "rss_mb": round(statistics.median(r["rss_mb"] for r in results), 1),
+    }
+    loaded = sorted({m for r in results for m in r["loaded"]})
+
+    print(f"import time : {current['import_s'] * 1000:.1f} ms (median of {args.runs})")
+    print(f"RSS at boot : {current['rss_mb']:.1f} MB")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: eagerly imported {', '.join(loaded)}")
+        failed = True
+
+    failed = record_or_compare("startup", current, args.update, args.tolerance) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""MongoDB lifecycle: one pooled client, a health probe and a circuit breaker.
+
+The client is built once per worker. A daemon thread pings the server; after
+`failure_threshold` consecutive failures (from the probe or from requests)
+the breaker opens and check() fails fast instead of letting every request
+wait on server selection. While open, the probe retries with exponential
+backoff and closes the breaker on the first successful ping.
+"""
+
+import threading
+import time
+
+from flask_pymongo import PyMongo
+
+
+class DatabaseUnavailable(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__("database unavailable")
+        self.retry_after = retry_after
+
+
+class DatabaseManager:
+
+    def __init__(self, app, probe_interval=10, failure_threshold=3,
+                 base_backoff=1, max_backoff=30, **client_options):
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+        self.backoff = base_backoff
+        self.last_probe = None
+        self.last_error = None
+
+        # PyMongo only validates the URI here, it connects lazily
+        self.mongo = PyMongo(app, **client_options)
+        self.probe_thread = None
+
+    # --- breaker state -------------------------------------------------
+
+    def check(self):
+        """Raises DatabaseUnavailable while the breaker is open."""
+        with self.lock:
+            if self.open_until == 0:
+                return
+            remaining = self.open_until - time.monotonic()
+        # Once the backoff has elapsed requests go through again (half-open)
+        if remaining > 0:
+            raise DatabaseUnavailable(max(1, int(remaining + 0.5)))
+
+    def record_success(self):
+        with self.lock:
+            was_open = self.open_until > 0
+            self.failures = 0
+            self.open_until = 0.0
+            self.backoff = self.base_backoff
+            self.last_error = None
+        if was_open:
+            print("✅ MongoDB reachable again, circuit closed")
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.failures < self.failure_threshold:
+                return
+            if self.open_until == 0:
+                print(f"⚠️ MongoDB unavailable, circuit open: {error}")
+            else:
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            self.open_until = time.monotonic() + self.backoff
+
+    # --- health probe --------------------------------------------------
+
+    def ping(self):
+        try:
+            self.mongo.cx.admin.command("ping")
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        finally:
+            self.last_probe = time.time()
+        self.record_success()
+        return True
+
+    def start_probe(self):
+        if self.probe_thread is None:
+            self.probe_thread = threading.Thread(target=self._probe_loop, name="mongo-health", daemon=True)
+            self.probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            self.ping()
+            with self.lock:
+                delay = (max(0.0, self.open_until - time.monotonic())
+                         if self.open_until else self.probe_interval)
+            time.sleep(delay)
+
+    def status(self):
+        with self.lock:
+            return {
+                "state": "open" if self.open_until else "closed",
+                "consecutive_failures": self.failures,
+                "retry_in": max(0.0, round(self.open_until - time.monotonic(), 1)) if self.open_until else 0,
+                "last_probe": self.last_probe,
+                "last_error": self.last_error
+            }
@@ -1,82 +1,287 @@
-import subprocess
+"""Video compression for portfolio uploads.
+
+Headless (build boxes, batch jobs):
+
+    python frontend/compressor.py clip.mov -o clip.mp4
+    python frontend/compressor.py raw_videos/ -o compressed/ --encoder svtav1
+    python frontend/compressor.py raw_videos/ --jobs 2 --threads 8 --force
+
+With no arguments it opens the original file-picker GUI (NVENC).
+
+Directory mode mirrors the tree into the output directory and runs a bounded
+pool of ffmpeg processes (cores / --threads by default). Outputs newer than
+their source and tagged with the same encoder settings are skipped. Each
+encode writes to a .part file first, so an interrupted run never leaves a
+truncated output that looks up to date.
+"""
+
+import argparse
+import json
 import os
-import ctypes
-from tkinter import Tk, filedialog, messagebox
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# ---- DPI FIX (Windows) ----
-try:
-    ctypes.windll.shcore.SetProcessDpiAwareness(1)
-except Exception:
-    pass
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov")
 
-def compress_video_gpu(input_path, output_path, root, cq=19):
-    if not os.path.exists(input_path):
-        messagebox.showerror("Error", "Input file not found")
-        root.quit()
-        root.destroy()
-        return
+# cq 19 on NVENC ~ CRF 19 on x264; SVT-AV1's CRF scale sits higher for the same quality
+ENCODERS = {
+    "nvenc": {"quality": 19, "args": lambda q, threads: [
+        "-c:v", "h264_nvenc", "-preset", "p5", "-rc:v", "vbr", "-cq:v", str(q), "-b:v", "0",
+        "-profile:v", "high"
+    ]},
+    "x264": {"quality": 19, "args": lambda q, threads: [
+        "-c:v", "libx264", "-preset", "slow", "-crf", str(q), "-profile:v", "high",
+        "-threads", str(threads)
+    ]},
+    "svtav1": {"quality": 30, "args": lambda q, threads: [
+        "-c:v", "libsvtav1", "-preset", "6", "-crf", str(q),
+        "-svtav1-params", f"lp={threads}"
+    ]},
+}
 
-    command = [
-        "ffmpeg",
-        "-y",
-        "-i", input_path,
+COMMON_ARGS = [
+    "-pix_fmt", "yuv420p",
+    "-movflags", "+faststart",
+    # audio
+    "-c:a", "aac",
+    "-b:a", "192k",
+]
 
-        # GPU encoder (NVENC)
-        "-c:v", "h264_nvenc",
-        "-preset", "p5",
-        "-rc:v", "vbr",
-        "-cq:v", str(cq),
-        "-b:v", "0",
-        "-profile:v", "high",
-        "-pix_fmt", "yuv420p",
 
-        "-movflags", "+faststart",
+class CompressionError(Exception):
+    pass
+
 
-        # audio
-        "-c:a", "aac",
-        "-b:a", "192k",
+def settings_tag(encoder, quality):
+    """Stored in the output's comment tag to tell stale outputs from current ones."""
+    return f"compressor:{encoder}:q{quality}"
 
+
+def build_command(input_path, output_path, encoder, quality, threads):
+    return [
+        "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", input_path,
+        *ENCODERS[encoder]["args"](quality, threads),
+        *COMMON_ARGS,
+        "-metadata", f"comment={settings_tag(encoder, quality)}",
+        "-progress", "pipe:1", "-nostats",
         output_path
     ]
 
+
+def probe(path):
+    """(duration in seconds, comment tag) via ffprobe; (0, None) when unreadable."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration:format_tags=comment",
+             "-of", "json", path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        fmt = json.loads(out).get("format", {})
+        return float(fmt.get("duration") or 0), fmt.get("tags", {}).get("comment")
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return 0.0, None
+
+
+def is_up_to_date(input_path, output_path, encoder, quality):
+    if not os.path.exists(output_path) or os.path.getmtime(output_path) < os.path.getmtime(input_path):
+        return False
+    return probe(output_path)[1] == settings_tag(encoder, quality)
+
+
+def compress_video(input_path, output_path, encoder="x264", quality=None, threads=0, on_progress=None):
+    """Encodes input_path to output_path, calling on_progress(fraction) as
+    ffmpeg reports it. Raises CompressionError when ffmpeg fails."""
+    if not os.path.exists(input_path):
+        raise CompressionError(f"Input file not found: {input_path}")
+    if quality is None:
+        quality = ENCODERS[encoder]["quality"]
+
+    duration, _ = probe(input_path)
     try:
-        subprocess.run(command, check=True)
-        messagebox.showinfo(
-            "Success",
-            f"Video compressed successfully!\n\nSaved at:\n{output_path}"
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    except OSError as e:
+        raise CompressionError(f"Could not create the output directory: {e}") from e
+    root, ext = os.path.splitext(output_path)
+    part_path = f"{root}.part{ext}"
+
+    try:
+        process = subprocess.Popen(
+            build_command(input_path, part_path, encoder, quality, threads),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         )
-    except subprocess.CalledProcessError:
-        messagebox.showerror("Error", "FFmpeg failed to compress the video")
+    except OSError as e:
+        # ffmpeg missing or not executable: fail this item, not the whole batch
+        raise CompressionError(f"Could not start ffmpeg: {e}") from e
+    # Drained on a thread so a chatty stderr can't block ffmpeg
+    stderr = []
+    drain = threading.Thread(target=lambda: stderr.extend(process.stderr), daemon=True)
+    drain.start()
+
+    try:
+        # -progress emits key=value blocks, each closed by progress=continue|end
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "out_time_us" and duration and on_progress and value.isdigit():
+                on_progress(min(1.0, int(value) / 1e6 / duration))
+            elif key == "progress" and value == "end" and on_progress:
+                on_progress(1.0)
+        process.wait()
     finally:
-        root.quit()
-        root.destroy()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drain.join()
+        if process.returncode != 0 and os.path.exists(part_path):
+            os.remove(part_path)
+
+    if process.returncode != 0:
+        raise CompressionError("".join(stderr).strip() or f"ffmpeg exited with {process.returncode}")
+
+    try:
+        os.replace(part_path, output_path)
+    except OSError as e:
+        raise CompressionError(f"Could not write {output_path}: {e}") from e
+    return output_path
+
+
+def find_videos(input_dir, output_dir):
+    output_dir = os.path.abspath(output_dir)
+    for subdir, dirs, files in os.walk(input_dir):
+        # Don't pick up our own outputs when the output dir is nested inside
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(subdir, d)) != output_dir]
+        for file in sorted(files):
+            if file.lower().endswith(VIDEO_EXTENSIONS) and ".part." not in file:
+                source = os.path.join(subdir, file)
+                rel = os.path.splitext(os.path.relpath(source, input_dir))[0] + ".mp4"
+                yield source, os.path.join(output_dir, rel)
+
+
+def run_batch(pairs, encoder, quality, jobs, threads, force):
+    """Compresses (input, output) pairs on `jobs` concurrent ffmpeg processes."""
+    todo = [(i, o) for i, o in pairs if force or not is_up_to_date(i, o, encoder, quality)]
+    skipped = len(pairs) - len(todo)
+    print(f"{len(pairs)} videos, {skipped} up to date, {len(todo)} to compress "
+          f"({jobs} at a time, {encoder})")
+
+    print_lock = threading.Lock()
+
+    def progress_printer(name):
+        last = [-1]
+
+        def report(fraction):
+            step = int(fraction * 10)
+            if step > last[0]:
+                last[0] = step
+                with print_lock:
+                    print(f"  {name}: {step * 10}%")
+        return report
+
+    failed = 0
+    source_total = output_total = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(compress_video, i, o, encoder, quality, threads, progress_printer(os.path.basename(i))): (i, o)
+            for i, o in todo
+        }
+        for future in as_completed(futures):
+            input_path, output_path = futures[future]
+            try:
+                future.result()
+            except CompressionError as e:
+                failed += 1
+                print(f"Failed to compress {input_path}: {e}")
+                continue
+            source_total += os.path.getsize(input_path)
+            output_total += os.path.getsize(output_path)
+            print(f"Compressed: {input_path} -> {output_path}")
+
+    mb = 1024 * 1024
+    print(f"{len(todo) - failed} compressed, {skipped} skipped, {failed} failed; "
+          f"{source_total / mb:.1f} MB -> {output_total / mb:.1f} MB")
+    return 1 if failed else 0
+
+#-------------------------------------------------------
+#----------- GUI -----------------------
+#-------------------------------------------------------
+
+
+def run_gui():
+    """The original picker flow: choose a video, choose where to save, NVENC encode."""
+    import ctypes
+    from tkinter import Tk, filedialog, messagebox
+
+    # ---- DPI FIX (Windows) ----
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except Exception:
+        pass
 
-def main():
     root = Tk()
     root.withdraw()  # no main window
 
-    # Select input video
-    input_video = filedialog.askopenfilename(
-        title="Select video to compress",
-        filetypes=[("Video Files", "*.mp4 *.mkv *.avi *.mov")]
-    )
-    if not input_video:
-        root.quit()
-        root.destroy()
-        return
-
-    # Select output file
-    output_video = filedialog.asksaveasfilename(
-        title="Save compressed video as",
-        defaultextension=".mp4",
-        filetypes=[("MP4 Video", "*.mp4")]
-    )
-    if not output_video:
+    try:
+        # Select input video
+        input_video = filedialog.askopenfilename(
+            title="Select video to compress",
+            filetypes=[("Video Files", "*.mp4 *.mkv *.avi *.mov")]
+        )
+        if not input_video:
+            return
+
+        # Select output file
+        output_video = filedialog.asksaveasfilename(
+            title="Save compressed video as",
+            defaultextension=".mp4",
+            filetypes=[("MP4 Video", "*.mp4")]
+        )
+        if not output_video:
+            return
+
+        try:
+            compress_video(input_video, output_video, encoder="nvenc")
+            messagebox.showinfo(
+                "Success",
+                f"Video compressed successfully!\n\nSaved at:\n{output_video}"
+            )
+        except CompressionError:
+            messagebox.showerror("Error", "FFmpeg failed to compress the video")
+    finally:
         root.quit()
         root.destroy()
-        return
 
-    compress_video_gpu(input_video, output_video, root)
+
+def main():
+    if len(sys.argv) == 1:
+        run_gui()
+        return 0
+
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="video file or directory")
+    parser.add_argument("-o", "--output", help="output file or directory (default: <input>_compressed)")
+    parser.add_argument("--encoder", choices=sorted(ENCODERS), default="x264")
+    parser.add_argument("--quality", type=int, help="CRF/CQ (default: 19 for x264/nvenc, 30 for svtav1)")
+    parser.add_argument("--threads", type=int, default=min(4, cores), help="encoder threads per job")
+    parser.add_argument("--jobs", type=int, help="concurrent ffmpeg processes (default: cores / threads)")
+    parser.add_argument("--force", action="store_true", help="re-encode even if the output is current")
+    args = parser.parse_args()
+
+    quality = args.quality if args.quality is not None else ENCODERS[args.encoder]["quality"]
+    # NVENC sessions are capped by the driver, not by cores
+    jobs = args.jobs or (2 if args.encoder == "nvenc" else max(1, cores // max(1, args.threads)))
+
+    if os.path.isdir(args.input):
+        output_dir = args.output or args.input.rstrip("/\\") + "_compressed"
+        pairs = list(find_videos(args.input, output_dir))
+    else:
+        output = args.output or os.path.splitext(args.input)[0] + "_compressed.mp4"
+        pairs = [(args.input, output)]
+
+    return run_batch(pairs, args.encoder, quality, jobs, args.threads, args.force)
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,21 +1,192 @@
+"""Converts the JPG/PNG assets under frontend/public to WebP.
+
+Encodes run on a process pool. A content-hash manifest records what each
+.webp was built from, so re-runs only touch sources that changed (or whose
+.webp went missing) and settings changes rebuild everything. Quality and
+size defaults are the ones server-side uploads use (images.optimize_image).
+
+    python frontend/convert_images.py                          # frontend/public
+    python frontend/convert_images.py frontend/public/services --quality 90
+    python frontend/convert_images.py --force --workers 8
+    python frontend/convert_images.py --dry-run
+"""
+
+import argparse
+import hashlib
+import io
+import json
 import os
-from PIL import Image
-
-def convert_to_webp(root_dir):
-    extensions = ('.jpg', '.jpeg', '.png')
-    for subdir, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.lower().endswith(extensions):
-                filepath = os.path.join(subdir, file)
-                filename = os.path.splitext(file)[0]
-                webp_path = os.path.join(subdir, filename + ".webp")
-                
-                try:
-                    with Image.open(filepath) as img:
-                        img.save(webp_path, "webp")
-                        print(f"Converted: {filepath} -> {webp_path}")
-                except Exception as e:
-                    print(f"Failed to convert {filepath}: {e}")
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+FRONTEND = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(FRONTEND))
+
+from images import MAX_SIDE, WEBP_QUALITY  # noqa: E402
+
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+MANIFEST = os.path.join(FRONTEND, ".webp-manifest.json")
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def find_sources(roots):
+    for root in roots:
+        for subdir, dirs, files in os.walk(root):
+            for file in files:
+                if file.lower().endswith(EXTENSIONS):
+                    yield os.path.join(subdir, file)
+
+
+def webp_path(source):
+    return os.path.splitext(source)[0] + ".webp"
+
+
+def convert(source, settings):
+    """Runs in a pool worker. Returns (source, source bytes, webp bytes, error)."""
+    from PIL import Image
+
+    try:
+        with Image.open(source) as img:
+            # Icons keep their transparency, everything else is flattened to RGB
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+            img = img.convert("RGBA" if has_alpha else "RGB")
+            if max(img.size) > settings["max_side"]:
+                img.thumbnail((settings["max_side"], settings["max_side"]), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            img.save(
+                buffer,
+                format="WEBP",
+                quality=settings["quality"],
+                method=settings["method"],
+                lossless=settings["lossless"]
+            )
+
+        with open(webp_path(source), "wb") as f:
+            f.write(buffer.getvalue())
+        return source, os.path.getsize(source), buffer.tell(), None
+    except Exception as e:
+        return source, os.path.getsize(source), 0, str(e)
+
+
+def plan(sources, manifest, settings, force):
+    """Splits sources into (to convert, up to date). Unchanged size+mtime skips
+    the hash; a touched but identical file only refreshes its manifest entry."""
+    todo, current = [], []
+    for source in sources:
+        key = os.path.relpath(source, FRONTEND).replace(os.sep, "/")
+        entry = manifest.get(key)
+        stat = os.stat(source)
+        fresh = (
+            not force
+            and entry is not None
+            and entry.get("settings") == settings
+            and os.path.exists(webp_path(source))
+        )
+        if fresh and (entry["size"], entry["mtime"]) != (stat.st_size, stat.st_mtime):
+            fresh = entry["sha1"] == file_hash(source)
+            if fresh:
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+        (current if fresh else todo).append(source)
+    return todo, current
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("roots", nargs="*", default=[os.path.join(FRONTEND, "public")])
+    parser.add_argument("--quality", type=int, default=WEBP_QUALITY)
+    parser.add_argument("--max-side", type=int, default=MAX_SIDE, help="longest side in pixels")
+    parser.add_argument("--method", type=int, default=6, choices=range(7), help="WebP effort, 6 = smallest")
+    parser.add_argument("--lossless", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--force", action="store_true", help="re-encode everything")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be converted")
+    parser.add_argument("--manifest", default=MANIFEST)
+    args = parser.parse_args()
+
+    settings = {
+        "quality": args.quality,
+        "max_side": args.max_side,
+        "method": args.method,
+        "lossless": args.lossless
+    }
+
+    manifest = load_manifest(args.manifest)
+    sources = sorted(find_sources(args.roots))
+    todo, current = plan(sources, manifest, settings, args.force)
+
+    print(f"{len(sources)} sources, {len(current)} up to date, {len(todo)} to convert")
+    if args.dry_run:
+        for source in todo:
+            print(f"  {source}")
+        return 0
+
+    converted = failed = 0
+    source_total = webp_total = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for source, source_bytes, webp_bytes, error in pool.map(
+            convert, todo, [settings] * len(todo), chunksize=4
+        ):
+            if error:
+                failed += 1
+                print(f"Failed to convert {source}: {error}")
+                continue
+
+            converted += 1
+            source_total += source_bytes
+            webp_total += webp_bytes
+            print(f"Converted: {source} ({format_bytes(source_bytes)} -> {format_bytes(webp_bytes)})")
+
+            stat = os.stat(source)
+            manifest[os.path.relpath(source, FRONTEND).replace(os.sep, "/")] = {
+                "sha1": file_hash(source),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "webp_size": webp_bytes,
+                "settings": settings
+            }
+
+    # Forget sources that no longer exist
+    existing = {os.path.relpath(s, FRONTEND).replace(os.sep, "/") for s in sources}
+    scanned = [os.path.relpath(r, FRONTEND).replace(os.sep, "/").rstrip("/") + "/" for r in args.roots]
+    for key in list(manifest):
+        if key not in existing and any(key.startswith(prefix) for prefix in scanned):
+            del manifest[key]
+    save_manifest(args.manifest, manifest)
+
+    saved = source_total - webp_total
+    percent = 100 * saved / source_total if source_total else 0
+    print(f"{converted} converted, {len(current)} skipped, {failed} failed; "
+          f"{format_bytes(source_total)} -> {format_bytes(webp_total)}, saved {format_bytes(saved)} ({percent:.0f}%)")
+    return 1 if failed else 0
+
 
 if __name__ == "__main__":
-    convert_to_webp(r"d:\Development\MyPortfolio\frontend\public")
+    sys.exit(main())
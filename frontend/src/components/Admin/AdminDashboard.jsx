@@ -7,6 +7,7 @@ import { toast } from "sonner"
 const AdminDashboard = () => {
     const navigate = useNavigate();
     const [isAdmin, setIsAdmin] = useState(null); // null = checking
+    const [stats, setStats] = useState(null);
 
     useEffect(() => {
         axios
@@ -19,6 +20,15 @@ const AdminDashboard = () => {
             });
     }, []);
 
+    // Counts come from the incrementally maintained /admin/stats, not from paging the lists
+    useEffect(() => {
+        if (!isAdmin) return;
+        axios
+            .get("/admin/stats", { withCredentials: true })
+            .then((res) => setStats(res.data))
+            .catch(() => setStats(null));
+    }, [isAdmin]);
+
     if (isAdmin === null) {
         return <div>Checking access...</div>;
     }
@@ -53,6 +63,7 @@ const AdminDashboard = () => {
                             className={({ isActive }) => isActive ? 'active' : ''}
                         >
                             Messages
+                            {stats && <span className="nav-count">{stats.messages.pending}</span>}
                         </NavLink>
                     </li>
                     <li>
@@ -69,6 +80,7 @@ const AdminDashboard = () => {
                             className={({ isActive }) => isActive ? 'active' : ''}
                         >
                             Media
+                            {stats && <span className="nav-count">{stats.media.total}</span>}
                         </NavLink>
                     </li>
                 </ul>
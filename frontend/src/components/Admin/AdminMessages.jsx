@@ -64,6 +64,27 @@ const AdminMessages = () => {
             ...prev,
             [id]: !prev[id]
         }));
+        if (!expandedIds[id]) {
+            loadThread(id);
+        }
+    };
+
+    // List rows only carry a preview of the latest entry, the full thread is fetched on expand
+    const loadThread = async (id) => {
+        const msg = messages.find(m => m._id === id);
+        if (!msg || msg.thread || (msg.entry_count <= 1 && msg.preview.length < 280)) return;
+
+        try {
+            const response = await axios.get(`/admin/messages/${id}/entries?limit=100`, {
+                withCredentials: true
+            });
+            const thread = response.data.data.map(entry => entry.text).join("\n\n---\n\n");
+            setMessages(prev =>
+                prev.map(m => (m._id === id ? { ...m, thread } : m))
+            );
+        } catch (error) {
+            toast.error("Failed to load the full conversation.");
+        }
     };
 
     const toggleStatus = async (e, id, currentStatus) => {
@@ -178,7 +199,7 @@ const AdminMessages = () => {
                             {/* Body: Message Content */}
                             <div className="card-body">
                                 <p className={`message-text ${isExpanded ? 'full' : 'truncated'}`}>
-                                    {msg.message}
+                                    {isExpanded && msg.thread ? msg.thread : msg.message}
                                 </p>
                                 <div className="expand-hint">
                                     {isExpanded ? 'Click to collapse' : 'Click to read more'}
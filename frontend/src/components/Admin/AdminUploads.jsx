@@ -1,10 +1,11 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { toast } from "sonner";
 
 import { isMobile } from "../utils/device";
 
 const MAX_VIDEO_MB = 10; // 🔒 HARD LIMIT
+const JOB_POLL_MS = 1000; // ⏳ Background job status polling
 
 const AdminUploads = () => {
   const [title, setTitle] = useState("");
@@ -19,6 +20,15 @@ const AdminUploads = () => {
   const [fileSize, setFileSize] = useState(null);
   const [uploadProgress, setUploadProgress] = useState(0);
   const [uploadEta, setUploadEta] = useState(null);
+  const [jobStage, setJobStage] = useState(null); // ⚙️ Server-side processing stage
+  const mounted = useRef(true);
+
+  useEffect(() => {
+    mounted.current = true;
+    return () => {
+      mounted.current = false; // stops job polling
+    };
+  }, []);
 
   // 🛡️ PREVENT ACCIDENTAL RELOADS / CLOSING
   useEffect(() => {
@@ -95,6 +105,65 @@ const AdminUploads = () => {
     return response.data; // contains secure_url, public_id
   };
 
+  // ⏳ Photos are processed in the background: poll the job until it settles
+  const waitForJob = async (jobId) => {
+    while (mounted.current) {
+      const { data } = await axios.get(`/admin/upload/status/${jobId}`, {
+        withCredentials: true
+      });
+      if (data.status === "done" || data.status === "failed") return data;
+
+      setJobStage(data.stage);
+      setUploadProgress(data.progress);
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+    }
+    return null;
+  };
+
+  const trackJob = async (jobId) => {
+    setJobStage("queued");
+    setUploadProgress(0);
+    setUploadEta(null);
+
+    try {
+      const job = await waitForJob(jobId);
+      if (!job) return;
+
+      if (job.status === "done") {
+        toast.success("Upload processed successfully!");
+        resetForm();
+        return;
+      }
+
+      // ❌ Keep the form filled and offer the retry route when it can help
+      if (!job.retriable) {
+        toast.error(`Processing failed: ${job.error || "unknown error"}`);
+        return;
+      }
+      toast.error(`Processing failed: ${job.error || "unknown error"}`, {
+        duration: Infinity,
+        action: { label: "Retry", onClick: () => retryJob(jobId) }
+      });
+    } catch (err) {
+      toast.error(err.response?.data?.message || "Could not check the upload status");
+    } finally {
+      setJobStage(null);
+    }
+  };
+
+  const retryJob = async (jobId) => {
+    setLoad(true);
+    try {
+      await axios.post(`/admin/upload/retry/${jobId}`, null, { withCredentials: true });
+      await trackJob(jobId);
+    } catch (err) {
+      toast.error(err.response?.data?.message || "Retry failed");
+    } finally {
+      setLoad(false);
+      setUploadProgress(0);
+    }
+  };
+
   const doUpload = async (uploadFile) => {
     // 🛑 VALIDATION: Check required metadata first
     if (!title.trim() || !description.trim() || !skills.trim()) {
@@ -205,10 +274,16 @@ const AdminUploads = () => {
           }
         },
       });
-      toast.success(response.data.message);
-      resetForm();
+      if (response.status === 202 && response.data.job_id) {
+        // 📨 Accepted: optimize + Cloudinary run in the background
+        toast.info(response.data.message);
+        await trackJob(response.data.job_id);
+      } else {
+        toast.success(response.data.message);
+        resetForm();
+      }
     } catch (err) {
-      toast.error("Upload Failed");
+      toast.error(err.response?.data?.message || "Upload Failed");
       setLoad(false);
       setUploadProgress(0);
     }
@@ -225,6 +300,7 @@ const AdminUploads = () => {
     setSkills("");
     setUploadProgress(0);
     setUploadEta(null);
+    setJobStage(null);
     setLoad(false);
   };
 
@@ -614,8 +690,10 @@ const AdminUploads = () => {
           load && (
             <div className="upload-progress-container" style={{ marginBottom: '20px', background: 'rgba(255,255,255,0.02)', padding: '15px', borderRadius: '12px', border: '1px solid rgba(255,255,255,0.05)' }}>
               <div className="progress-info" style={{ display: 'flex', justifyContent: 'space-between', color: '#94a3b8', fontSize: '0.9rem', marginBottom: '10px', fontWeight: '500' }}>
-                <span style={{ color: '#fff' }}>Uploading... {uploadProgress}%</span>
-                <span>{uploadEta ? `~${uploadEta} remaining` : 'Calculating...'}</span>
+                <span style={{ color: '#fff' }}>
+                  {jobStage ? `Processing (${jobStage})... ${uploadProgress}%` : `Uploading... ${uploadProgress}%`}
+                </span>
+                <span>{jobStage ? 'Running on the server' : uploadEta ? `~${uploadEta} remaining` : 'Calculating...'}</span>
               </div>
 
               <div className="progress-bar-track" style={{ width: '100%', height: '8px', background: 'rgba(255,255,255,0.1)', borderRadius: '10px', overflowX: 'hidden' }}>
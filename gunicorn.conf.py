@@ -0,0 +1,22 @@
+# gunicorn -c gunicorn.conf.py server:app
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+# Read by server.py to pick a rate limit backend the workers share
+os.environ["WEB_CONCURRENCY"] = str(workers)
+bind = os.getenv("BIND", "0.0.0.0:" + os.getenv("PORT", "5000"))
+
+
+def on_starting(server):
+    # Stale sample files from a previous run would be merged into /metrics
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,160 @@
+"""Image optimization for admin uploads.
+
+PIL is imported inside the functions so that importing this module (and
+server.py) stays cheap; only the upload paths pay for it.
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# ✅ SAFE resolution (no blur)
+MAX_SIDE = 2048   # 👈 ye key hai
+WEBP_QUALITY = 82     # 👈 sharp & safe
+
+# Upload ceilings, checked before any pixel data is decoded
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 50 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 100_000_000))
+
+# Widths served to the portfolio grid through srcset
+VARIANT_WIDTHS = (320, 640, 1024, 2048)
+
+encode_pool = None
+encode_pool_lock = threading.Lock()
+
+
+def get_encode_pool():
+    """Process pool for WebP encoding, created on the first upload.
+
+    Workers come from a forkserver (spawn where that doesn't exist): by the
+    time an upload arrives the process runs pymongo monitors, the DB probe
+    and the upload pool, and forking a multi-threaded process can deadlock.
+
+    The forkserver only preloads this module, which has no import-time side
+    effects. Each worker still re-runs the entry script as "__mp_main__"
+    (that is how multiprocessing starts children), so the script must keep
+    its startup work behind a `__name__` check: gunicorn's and uvicorn's do,
+    and server.py skips its own when run under `python server.py`.
+    """
+    global encode_pool
+    with encode_pool_lock:
+        if encode_pool is None:
+            workers = int(os.getenv("IMAGE_PROCESSES", min(4, os.cpu_count() or 1)))
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                multiprocessing.set_forkserver_preload(["images"])
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            encode_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return encode_pool
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def stream_size(file):
+    """Byte length of a seekable stream or path, without reading it."""
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def decode_image(file, max_side=MAX_SIDE):
+    """Decodes straight from the upload stream into an RGB image whose longest
+    side is at most max_side.
+
+    Oversized inputs (bytes or pixels) are rejected from the header alone. For
+    JPEGs, draft() lets libjpeg decode at 1/2, 1/4 or 1/8 scale, so a 50MP photo
+    never materialises at full resolution.
+    """
+    from PIL import Image
+
+    if stream_size(file) > MAX_IMAGE_BYTES:
+        raise ImageTooLarge(f"Image is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+
+    img = Image.open(file)
+    w, h = img.size
+    if w * h > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f"Image has more than {MAX_IMAGE_PIXELS // 1_000_000} megapixels")
+
+    scale = min(1.0, max_side / max(w, h))
+    target = (max(1, int(w * scale)), max(1, int(h * scale)))
+
+    if img.format == "JPEG" and scale <= 0.5:
+        # Picks the smallest DCT scale that is still >= target, no quality loss
+        img.draft("RGB", target)
+
+    img.load()
+
+    # Resize before converting when the mode allows it, so the conversion
+    # runs on the small image instead of a full-size copy
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGB")
+
+    if img.size != target and max(img.size) > max_side:
+        img = img.resize(target, Image.LANCZOS)
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    return img
+
+
+def encode_webp(img):
+    buffer = io.BytesIO()
+    img.save(
+        buffer,
+        format="WEBP",
+        quality=WEBP_QUALITY,
+        optimize=True
+    )
+    return buffer.getvalue()
+
+
+def optimize_image(file):
+    img = decode_image(file)
+
+    buffer = io.BytesIO(encode_webp(img))
+    buffer.seek(0)
+    return buffer
+
+
+def generate_variants(file, widths=VARIANT_WIDTHS):
+    """Decodes once and returns [(width, BytesIO)] sorted by width.
+
+    Smaller widths are resized from the next larger one, and the WebP encodes
+    (the expensive part) run in parallel on the process pool. The full-size
+    image (capped at MAX_SIDE) is always included.
+    """
+    from PIL import Image
+
+    base = decode_image(file)
+
+    images = [base]
+    for width in sorted((w for w in widths if w < base.width), reverse=True):
+        previous = images[-1]
+        height = max(1, round(previous.height * width / previous.width))
+        images.append(previous.resize((width, height), Image.LANCZOS))
+
+    try:
+        encoded = list(get_encode_pool().map(encode_webp, images))
+    except BrokenProcessPool:
+        # A killed worker breaks the pool, encode inline and start fresh next time
+        global encode_pool
+        with encode_pool_lock:
+            encode_pool = None
+        encoded = [encode_webp(img) for img in images]
+
+    return sorted(
+        ((img.width, io.BytesIO(data)) for img, data in zip(images, encoded)),
+        key=lambda variant: variant[0]
+    )
@@ -0,0 +1,273 @@
+"""Every query shape server.py sends to Mongo, and the indexes that serve them.
+
+ensure_indexes() is run at boot and by GET /index; it only creates indexes
+whose keys don't exist yet, so it is safe from every gunicorn worker. Indexes
+use MongoDB's default key-derived names.
+
+The audit runs explain() on each registered query and aggregate and fails if
+any of them needs a collection scan or an in-memory sort. It seeds a scratch database, so
+point it at a local/dev Mongo:
+
+    python indexes.py --uri mongodb://localhost:27017/portfolio_index_audit
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+INDEXES = {
+    "message": [
+        # /messages status lookup, upsert and block_user (email prefix)
+        IndexModel([("email", ASCENDING), ("status", ASCENDING)]),
+        # /admin/messages newest-first listing and keyset cursors
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "media": [
+        # /fetch/media?type=... newest-first listing and keyset cursors
+        IndexModel([("file_type", ASCENDING), ("_id", DESCENDING)]),
+        # Upload jobs upsert on their job id so retries don't duplicate media
+        IndexModel([("job_id", ASCENDING)], sparse=True),
+        # /fetch/media/search keyword relevance
+        IndexModel(
+            [("title", TEXT), ("description", TEXT), ("skills", TEXT)],
+            weights={"title": 10, "skills": 5, "description": 1}
+        ),
+        # /fetch/media/search?skill=... without keywords
+        IndexModel([("skills", ASCENDING), ("_id", DESCENDING)]),
+        # Upload dedup: content hashes of the main asset and of video posters
+        IndexModel([("hashes", ASCENDING)], sparse=True),
+        IndexModel([("poster_hashes", ASCENDING)], sparse=True),
+        # Reference counts of shared Cloudinary assets before they are destroyed
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("variants.id", ASCENDING)], sparse=True),
+        IndexModel([("poster_id", ASCENDING)], sparse=True),
+    ],
+    "profiles": [
+        # /admin/profiles newest-first, optionally per endpoint
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel([("endpoint", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("expire_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        IndexModel([("expire_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "upload_jobs": [
+        # recover_stale: stuck queued/running jobs and long-failed ones
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)]),
+    ],
+}
+
+SAMPLE_ID = ObjectId()
+SAMPLE_TIME = datetime(2024, 1, 1)
+
+# name → (collection, filter, sort)
+QUERIES = {
+    "messages.status_lookup": (
+        "message",
+        {"email": "a@example.com", "status": {"$in": ["blocked", "pending", "responded"]}},
+        None,
+    ),
+    "messages.pending_upsert": ("message", {"email": "a@example.com", "status": "pending"}, None),
+    "messages.block_user": ("message", {"email": "a@example.com"}, None),
+    "admin_messages.page": ("message", {}, [("created_at", -1), ("_id", -1)]),
+    "admin_messages.after": (
+        "message",
+        {"$or": [
+            {"created_at": {"$lt": SAMPLE_TIME}},
+            {"created_at": SAMPLE_TIME, "_id": {"$lt": SAMPLE_ID}},
+            {"created_at": None},
+        ]},
+        [("created_at", -1), ("_id", -1)],
+    ),
+    "fetch_media.all": ("media", {}, [("_id", -1)]),
+    "fetch_media.all_after": ("media", {"_id": {"$lt": SAMPLE_ID}}, [("_id", -1)]),
+    "fetch_media.type": ("media", {"file_type": "photo"}, [("_id", -1)]),
+    "fetch_media.type_after": (
+        "media", {"file_type": "photo", "_id": {"$lt": SAMPLE_ID}}, [("_id", -1)]
+    ),
+    "upload_job.media_upsert": ("media", {"job_id": "0" * 32}, None),
+    "media_search.text": (
+        "media", {"$text": {"$search": "react"}}, [("score", {"$meta": "textScore"})]
+    ),
+    "media_search.skill": ("media", {"skills": "React"}, [("_id", -1)]),
+    "upload.hash_lookup": ("media", {"hashes": {"$in": ["0" * 64]}, "file_type": "photo"}, None),
+    "upload.poster_hash_lookup": (
+        "media", {"poster_hashes": {"$in": ["0" * 64]}, "poster_id": {"$nin": ["", None]}}, None
+    ),
+    "delete_media.references": (
+        "media",
+        {"$or": [{"id": {"$in": ["p1"]}}, {"variants.id": {"$in": ["p1"]}}, {"poster_id": {"$in": ["p1"]}}]},
+        None,
+    ),
+    "messages_export.resume": (
+        "message", {"status": {"$in": ["pending"]}, "_id": {"$gt": SAMPLE_ID}}, [("_id", 1)]
+    ),
+    "admin_profiles.list": ("profiles", {}, [("created_at", -1)]),
+    "admin_profiles.endpoint": ("profiles", {"endpoint": "fetch_media"}, [("created_at", -1)]),
+    "upload_jobs.recover_stale": (
+        "upload_jobs", {"status": {"$in": ["queued", "running"]}, "updated_at": {"$lt": SAMPLE_TIME}}, None
+    ),
+    "upload_jobs.expired_failed": (
+        "upload_jobs",
+        {"status": "failed", "retriable": {"$ne": False}, "updated_at": {"$lt": SAMPLE_TIME}},
+        None,
+    ),
+}
+
+# name → (collection, pipeline)
+AGGREGATES = {
+    "media_search.facets": (
+        "media",
+        [{"$facet": {
+            "skills": [
+                {"$unwind": "$skills"},
+                {"$group": {"_id": "$skills", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "types": [{"$group": {"_id": "$file_type", "count": {"$sum": 1}}}],
+        }}],
+    ),
+}
+
+BAD_STAGES = ("COLLSCAN", "SORT")
+
+ALLOWED_STAGES = {
+    # Ranking by text score always sorts the (already index-filtered) matches in memory
+    "media_search.text": {"SORT"},
+    # Counts over every document; $facet can't use an index, so server.py
+    # runs it once per media version (skill_facets)
+    "media_search.facets": {"COLLSCAN"},
+}
+
+
+def index_key(key):
+    """Comparable form of an index key. Text indexes are stored as _fts/_ftsx
+    and a collection can only have one, so they all compare equal."""
+    pairs = tuple(key.items()) if hasattr(key, "items") else tuple(tuple(pair) for pair in key)
+    if any(direction == TEXT or field == "_fts" for field, direction in pairs):
+        return ("text",)
+    return pairs
+
+
+def ensure_indexes(db):
+    """Creates the INDEXES that are missing. An existing index on the same keys
+    is kept whatever its name (older deploys created them through /index), and
+    a failing collection doesn't stop the others.
+
+    Returns ({collection: created index names}, {collection: error}).
+    """
+    created, failed = {}, {}
+    for collection, models in INDEXES.items():
+        try:
+            existing = {index_key(info["key"]) for info in db[collection].index_information().values()}
+            missing = [m for m in models if index_key(m.document["key"]) not in existing]
+            created[collection] = db[collection].create_indexes(missing) if missing else []
+        except Exception as e:
+            failed[collection] = str(e)
+    return created, failed
+
+
+def plan_stages(plan):
+    """Yields every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+def explain(db, collection, query, sort):
+    cursor = db[collection].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()["queryPlanner"]["winningPlan"]
+
+
+def winning_plans(explained):
+    """The winningPlan of every queryPlanner in an aggregate explain()."""
+    if isinstance(explained, dict):
+        if "winningPlan" in explained:
+            yield explained["winningPlan"]
+        for key, value in explained.items():
+            if key != "rejectedPlans":
+                yield from winning_plans(value)
+    elif isinstance(explained, list):
+        for value in explained:
+            yield from winning_plans(value)
+
+
+def explain_aggregate(db, collection, pipeline):
+    return list(winning_plans(db.command("aggregate", collection, pipeline=pipeline, explain=True)))
+
+
+def seed(db):
+    """Enough documents that the planner has real indexes and data to choose from."""
+    db.message.insert_many([
+        {"email": f"user{i}@example.com", "status": "pending", "name": "n",
+         "message": "m", "ip": "127.0.0.1", "created_at": datetime.utcnow()}
+        for i in range(50)
+    ])
+    db.media.insert_many([
+        {"title": "t", "file_type": "photo" if i % 2 else "video", "description": "d",
+         "skills": ["s"], "url": "u", "id": f"p{i}"}
+        for i in range(50)
+    ])
+    db.upload_jobs.insert_many([
+        {"_id": f"{i:032x}", "status": ("queued", "running", "failed", "done")[i % 4],
+         "updated_at": datetime.utcnow()}
+        for i in range(50)
+    ])
+
+
+def audit(db):
+    """Returns {query name: [offending stages]} for every query that scans or sorts."""
+    plans = {name: explain(db, collection, query, sort) for name, (collection, query, sort) in QUERIES.items()}
+    plans.update(
+        (name, explain_aggregate(db, collection, pipeline)) for name, (collection, pipeline) in AGGREGATES.items()
+    )
+
+    problems = {}
+    for name, plan in plans.items():
+        stages = set(plan_stages(plan))
+        bad = sorted(stages.intersection(BAD_STAGES) - ALLOWED_STAGES.get(name, set()))
+        print(f"{'FAIL' if bad else 'ok  '} {name:<28} {', '.join(sorted(stages))}")
+        if bad:
+            problems[name] = bad
+    return problems
+
+
+def main():
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Audit query plans against the declared indexes.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/portfolio_index_audit")
+    parser.add_argument("--keep", action="store_true", help="don't drop the scratch database")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    db = client.get_default_database()
+    try:
+        seed(db)
+        _, failed = ensure_indexes(db)
+        for collection, error in failed.items():
+            print(f"FAIL index setup on {collection}: {error}")
+        problems = audit(db)
+    finally:
+        if not args.keep:
+            client.drop_database(db.name)
+
+    if problems:
+        print(f"{len(problems)} queries need a collection scan or in-memory sort")
+        return 1
+    print("All registered queries are index-backed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
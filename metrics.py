@@ -0,0 +1,128 @@
+"""Prometheus instrumentation for server.py.
+
+- per-endpoint request latency (Flask before/after_request hooks)
+- per-collection, per-command Mongo timings (pymongo CommandListener)
+- Cloudinary call timings (cloudinary_timer around each API call)
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+shared by the workers; /metrics then aggregates every worker's samples (see
+gunicorn.conf.py for the matching child_exit hook).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from pymongo import monitoring
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY,
+    generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by Flask endpoint",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"]
+)
+CLOUDINARY_LATENCY = Histogram(
+    "cloudinary_call_duration_seconds",
+    "Cloudinary API call latency",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+# Command names whose first argument is not a collection name
+NON_COLLECTION_COMMANDS = {"ping", "hello", "ismaster", "isMaster", "buildInfo",
+                           "endSessions", "saslStart", "saslContinue", "getMore"}
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command; getMore is attributed to its cursor's collection."""
+
+    def __init__(self):
+        self.pending = {}
+
+    def started(self, event):
+        command = event.command_name
+        if command == "getMore":
+            collection = event.command.get("collection", "")
+        elif command in NON_COLLECTION_COMMANDS:
+            collection = ""
+        else:
+            collection = event.command.get(command, "")
+        if not isinstance(collection, str):
+            collection = ""
+        self.pending[(event.connection_id, event.request_id)] = (collection, command)
+
+    def succeeded(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+            MONGO_FAILURES.labels(*labels).inc()
+
+
+def register_mongo_listener():
+    """Must run before the MongoClient is created; pymongo only picks up
+    globally registered listeners for new clients."""
+    monitoring.register(MongoCommandListener())
+
+
+@contextmanager
+def cloudinary_timer(operation):
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        CLOUDINARY_LATENCY.labels(operation, outcome).observe(time.perf_counter() - start)
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            # The URL rule, not the path, so serve_react stays one series
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - start
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        token = os.getenv("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return {"message": "unauthorized access"}, 403
+
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
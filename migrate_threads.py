@@ -0,0 +1,98 @@
+"""One-off migration: legacy message documents → append-only threads.
+
+Before threads were append-only, follow-ups were concatenated into the single
+`message` string with a "\\n\\n---\\n\\n" separator. This splits that string back
+into `entries`, fills in `entry_count` and `preview`, and drops `message`.
+Documents that got a follow-up appended before being migrated (both `message`
+and `entries`) keep those entries after the converted ones. Only documents
+that still have `message` are touched, so it is safe to re-run. When anything
+was converted the "message" collection version is bumped, so admin clients
+holding an ETag for the old listing refetch it.
+
+    python migrate_threads.py            # uses MONGO_URI from config.env
+    python migrate_threads.py --dry-run
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+SEPARATOR = "\n\n---\n\n"
+PREVIEW_CHARS = 280   # keep in sync with server.PREVIEW_CHARS
+BATCH_SIZE = 500
+
+
+def thread_fields(doc):
+    parts = (doc.get("message") or "").split(SEPARATOR)
+    # Only the latest submission's time is known, earlier ones are left unset
+    entries = [{"text": text, "created_at": None} for text in parts]
+    if doc.get("entries"):
+        entries += doc["entries"]
+    else:
+        entries[-1]["created_at"] = doc.get("created_at")
+    return {
+        "entries": entries,
+        "entry_count": len(entries),
+        "preview": entries[-1]["text"][:PREVIEW_CHARS]
+    }
+
+
+def migrate(db, dry_run=False):
+    cursor = db.message.find(
+        {"message": {"$exists": True}},
+        {"message": 1, "created_at": 1, "entries": 1, "entry_count": 1},
+        batch_size=BATCH_SIZE
+    )
+
+    ops = []
+    migrated = 0
+    for doc in cursor:
+        # Unchanged entry_count: no follow-up was appended since the read
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "message": {"$exists": True}, "entry_count": doc.get("entry_count")},
+            {"$set": thread_fields(doc), "$unset": {"message": ""}}
+        ))
+        if len(ops) == BATCH_SIZE:
+            migrated += flush(db, ops, dry_run)
+            ops = []
+    migrated += flush(db, ops, dry_run)
+
+    if migrated and not dry_run:
+        # Same counter server.bump_collection_version maintains
+        db.counters.update_one(
+            {"_id": "message"},
+            {"$inc": {"version": 1}, "$set": {"modified_at": datetime.utcnow()}},
+            upsert=True
+        )
+    return migrated
+
+
+def flush(db, ops, dry_run):
+    if not ops or dry_run:
+        return len(ops)
+    return db.message.bulk_write(ops, ordered=False).modified_count
+
+
+def main():
+    load_dotenv("config.env")
+    parser = argparse.ArgumentParser(description="Convert message blobs into append-only threads.")
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI"))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not args.uri:
+        print("MONGO_URI is not set")
+        return 1
+
+    db = MongoClient(args.uri).get_default_database()
+    count = migrate(db, args.dry_run)
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {count} message threads")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""On-demand and sampled request profiling for server.py.
+
+An admin session that sends `X-Profile: cprofile|sample` (or `?profile=...`)
+gets that one request profiled:
+
+- cprofile: deterministic, every Python call is counted; stores a pstats
+  report (top functions by cumulative time) and collapsed stacks weighted
+  by microseconds of self time. Adds noticeable overhead.
+- sample: a helper thread snapshots the request thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds and stores collapsed stacks
+  ("a;b;c <count>" lines, ready for flamegraph.pl or speedscope).
+
+pstats only keeps caller → callee edges, not whole stacks, so the cprofile
+stacks are rebuilt from that graph: a function called from several places
+has its time (and its callees') split between them in proportion to each
+caller's share. Totals per function are exact, individual paths are an
+estimate; use sample mode when the exact paths matter.
+
+With PROFILE_SAMPLE_RATE > 0, that fraction of requests to
+PROFILE_SAMPLE_ENDPOINTS is also run under the sampler in the background.
+
+Profiles are written to the `profiles` collection after the response has
+been sent and expire after PROFILE_RETENTION_HOURS. The response carries an
+X-Profile-Id header pointing at /admin/profiles/<id>.
+
+Only the Flask app is hooked; the native Quart routes in asgi.py are not
+profiled.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import g, request
+
+MODES = ("cprofile", "sample")
+
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.001))
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+SAMPLED_ENDPOINTS = {
+    e.strip() for e in os.getenv("PROFILE_SAMPLE_ENDPOINTS", "fetch_media,messages").split(",") if e.strip()
+}
+RETENTION = timedelta(hours=float(os.getenv("PROFILE_RETENTION_HOURS", 72)))
+
+MAX_STACKS = 2000
+REPORT_LINES = 60
+
+# What the count after each collapsed stack means, per mode
+COLLAPSED_UNITS = {
+    "cprofile": "microseconds of self time, paths estimated from the caller graph",
+    "sample": "samples",
+}
+
+# Everything except the (potentially large) profile payload
+SUMMARY_PROJECTION = {"collapsed": 0, "report": 0}
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """Root-first, semicolon separated stack of `frame`."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples one thread's stack from a helper thread.
+
+    The sampler needs the GIL to read frames, so stretches of pure Python are
+    seen at roughly sys.getswitchinterval() granularity (5ms by default),
+    while time blocked on sockets (Mongo, Cloudinary) or in C code that
+    releases the GIL (Pillow) is sampled at the full interval.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+
+def pstats_label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name   # built-ins, e.g. "<method 'read' of '_io.BufferedReader' objects>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def graph_stacks(profiler):
+    """Collapsed stacks rebuilt from the pstats caller graph, weighted by
+    microseconds of self time (see the module docstring)."""
+    entries = pstats.Stats(profiler).stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    stacks = Counter()
+
+    def walk(func, share, path):
+        _, _, self_time, cumulative, _ = entries[func]
+        path = path + (pstats_label(func),)
+        weight = round(self_time * share * 1e6)
+        if weight:
+            stacks[";".join(path)] += weight
+        for callee, edge_time in callees.get(func, {}).items():
+            callee_cumulative = entries[callee][3]
+            # Recursion is folded into the first frame of the cycle
+            if callee == func or pstats_label(callee) in path or not callee_cumulative:
+                continue
+            callee_share = min(1.0, edge_time * share / callee_cumulative)
+            if callee_share * callee_cumulative * 1e6 >= 1:
+                walk(callee, callee_share, path)
+
+    # Roots: whatever part of a function's time no recorded caller accounts
+    # for (calls made straight from the frame that enabled the profiler)
+    for func, (_, _, _, cumulative, callers) in entries.items():
+        called = sum(edge[3] for caller, edge in callers.items() if caller != func)
+        if cumulative and cumulative - called > 1e-6:
+            walk(func, (cumulative - called) / cumulative, ())
+    return stacks
+
+
+def format_collapsed(stacks):
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common(MAX_STACKS))
+
+
+def format_report(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(REPORT_LINES)
+    return out.getvalue()
+
+
+def requested_mode():
+    mode = request.headers.get("X-Profile") or request.args.get("profile")
+    if not mode:
+        return None
+    mode = mode.lower()
+    return mode if mode in MODES else "cprofile"
+
+
+def start(mode):
+    """Returns (mode, profiler); falls back to sampling when cProfile is taken."""
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            return mode, profiler
+        except ValueError:
+            # Python 3.12+ allows a single active cProfile per process
+            mode = "sample"
+
+    profiler = StackSampler(threading.get_ident())
+    profiler.start()
+    return mode, profiler
+
+
+def finish(mode, profiler):
+    """Stops the profiler and returns the fields it contributes to the record."""
+    if mode == "cprofile":
+        profiler.disable()
+        return {"report": format_report(profiler), "collapsed": format_collapsed(graph_stacks(profiler)), "samples": 0}
+
+    stacks = profiler.stop()
+    return {"report": "", "collapsed": format_collapsed(stacks), "samples": sum(stacks.values())}
+
+
+def summary_row(p):
+    return {
+        "_id": str(p["_id"]),
+        "endpoint": p.get("endpoint"),
+        "method": p.get("method"),
+        "path": p.get("path"),
+        "status": p.get("status"),
+        "mode": p.get("mode"),
+        "trigger": p.get("trigger"),
+        "duration_ms": p.get("duration_ms"),
+        "samples": p.get("samples", 0),
+        "created_at": p.get("created_at")
+    }
+
+
+def init_app(app, get_collection, is_admin):
+    """Registers the request hooks. `is_admin` is only consulted when a
+    request asks to be profiled, so normal requests never touch the session."""
+
+    @app.before_request
+    def start_profile():
+        mode = requested_mode()
+        trigger = "admin"
+        if mode and not is_admin():
+            mode = None
+
+        if mode is None:
+            if not SAMPLE_RATE or request.endpoint not in SAMPLED_ENDPOINTS or random.random() >= SAMPLE_RATE:
+                return
+            mode, trigger = "sample", "sampled"
+
+        mode, profiler = start(mode)
+        g.profile = (mode, trigger, profiler, time.perf_counter())
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+
+        mode, trigger, profiler, started = profile
+        duration = time.perf_counter() - started
+        now = datetime.utcnow()
+        record = {
+            "_id": ObjectId(),
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "status": response.status_code,
+            "mode": mode,
+            "trigger": trigger,
+            "duration_ms": round(duration * 1000, 2),
+            "created_at": now,
+            "expire_at": now + RETENTION,
+            **finish(mode, profiler)
+        }
+
+        def save():
+            try:
+                get_collection().insert_one(record)
+            except Exception as e:
+                print(f"⚠️ Could not store profile: {e}")
+
+        # Written once the client has its response
+        response.call_on_close(save)
+        response.headers["X-Profile-Id"] = str(record["_id"])
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # after_request is skipped when the request fails before a response exists
+        profile = g.pop("profile", None)
+        if profile is not None:
+            finish(profile[0], profile[2])
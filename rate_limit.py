@@ -0,0 +1,132 @@
+"""Sliding-window rate limiting for the Flask routes in server.py.
+
+Every attempt is recorded, including the ones that get rejected, so a client
+that keeps hammering a route stays limited until it backs off for a window.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+
+def parse_limit(spec):
+    """Parses "<count>/<seconds>" (e.g. "1/600") into a (count, seconds) tuple."""
+    count, seconds = spec.split("/")
+    return int(count), int(seconds)
+
+
+class MemoryBackend:
+    """Per-process sliding-window log.
+
+    Each key keeps a ring buffer of its last `limit` attempt times, so memory
+    per IP is bounded by the limit. Keys idle for longer than their window are
+    swept out periodically.
+    """
+
+    def __init__(self, sweep_interval=60):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self.next_sweep = time.monotonic() + sweep_interval
+
+    def hit(self, key, limit, window):
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_sweep:
+                self._sweep(now)
+
+            entry = self.buckets.get(key)
+            if entry is None:
+                entry = self.buckets[key] = (deque(maxlen=limit), window)
+            ring = entry[0]
+
+            # Full ring whose oldest attempt is still inside the window → limited
+            limited = len(ring) == limit and ring[0] > now - window
+            ring.append(now)
+            return limited
+
+    def _sweep(self, now):
+        idle = [k for k, (ring, window) in self.buckets.items()
+                if not ring or ring[-1] <= now - window]
+        for k in idle:
+            del self.buckets[k]
+        self.next_sweep = now + self.sweep_interval
+
+    def size(self):
+        with self.lock:
+            return len(self.buckets)
+
+
+class MongoBackend:
+    """Sliding-window counter shared by every worker through a TTL collection.
+
+    Attempts are counted in fixed buckets of `window` seconds and the previous
+    bucket is weighted by how much of it still overlaps the sliding window.
+    Old buckets are removed by Mongo's TTL monitor.
+    """
+
+    def __init__(self, get_db, collection="rate_limits"):
+        self.get_db = get_db
+        self.collection = collection
+
+    def hit(self, key, limit, window):
+        # The expire_at TTL index is declared in indexes.py with the others
+        coll = self.get_db()[self.collection]
+        now = time.time()
+        bucket = int(now // window)
+        bucket_end = datetime.utcfromtimestamp((bucket + 1) * window)
+
+        current = coll.find_one_and_update(
+            {"_id": f"{key}|{bucket}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {"expire_at": bucket_end + timedelta(seconds=window)}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = coll.find_one({"_id": f"{key}|{bucket - 1}"}, {"count": 1})
+
+        overlap = 1 - (now - bucket * window) / window
+        estimated = (previous["count"] if previous else 0) * overlap + current["count"]
+        return estimated > limit
+
+    def size(self):
+        return self.get_db()[self.collection].estimated_document_count()
+
+
+class RateLimiter:
+    """Routes name their limits, the backend decides where attempts are kept."""
+
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = dict(limits)
+        self.lock = threading.Lock()
+        self.allowed = {}
+        self.rejected = {}
+
+    def is_limited(self, route, key):
+        if route not in self.limits:
+            return False
+
+        limit, window = self.limits[route]
+        limited = self.backend.hit(f"{route}:{key}", limit, window)
+
+        counter = self.rejected if limited else self.allowed
+        with self.lock:
+            counter[route] = counter.get(route, 0) + 1
+        return limited
+
+    def stats(self):
+        keys = self.backend.size()
+        with self.lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "keys": keys,
+                "limits": {r: {"limit": l, "window": w} for r, (l, w) in self.limits.items()},
+                "allowed": dict(self.allowed),
+                "rejected": dict(self.rejected)
+            }
@@ -0,0 +1,39 @@
+"""JSON encoding for list endpoints.
+
+Uses orjson when it is installed and falls back to the stdlib encoder with
+the same output. ObjectIds become their hex string and datetimes ISO 8601;
+Mongo hands back naive UTC datetimes, so those get an explicit +00:00 and
+browsers don't read them as local time.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Serializes to compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+else:
+    def dumps(obj):
+        """Serializes to compact UTF-8 JSON bytes."""
+        return json.dumps(obj, default=default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -1,68 +1,119 @@
 import os
-import token
-from altair import Description
-from bson import ObjectId
-from dotenv import load_dotenv
-from flask import Flask, request, render_template_string, session, send_from_directory
-
-from flask_cors import CORS
-from flask_pymongo import PyMongo
-from pymongo.errors import PyMongoError
-import cloudinary, cloudinary.uploader
+import io
+import csv
+import importlib
+import re
+import json
+import base64
+import time
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-import os
-import token
-from altair import Description
 from bson import ObjectId
 from dotenv import load_dotenv
-from flask import Flask, request, render_template_string, session, send_from_directory
+from flask import Flask, Response, request, session, send_from_directory
 
 from flask_cors import CORS
-from flask_pymongo import PyMongo
-from pymongo.errors import PyMongoError
-import cloudinary, cloudinary.uploader
+from pymongo import ReturnDocument, UpdateOne, DeleteOne
+from pymongo.errors import ConnectionFailure, BulkWriteError
 
-import threading
 from itsdangerous import URLSafeTimedSerializer
-
-from datetime import datetime, timedelta
-import re
-from PIL import Image
-import io
+from werkzeug.http import http_date, parse_date, parse_etags
+
+from rate_limit import RateLimiter, MemoryBackend, MongoBackend, parse_limit
+from static_assets import build_manifest, serve_asset
+from upload_jobs import UploadJobQueue, QueueFull
+from db import DatabaseManager, DatabaseUnavailable
+from indexes import ensure_indexes
+import metrics
+import profiling
+import serialize
+import assets
+import stats
+from images import optimize_image, generate_variants, ImageTooLarge, MAX_IMAGE_BYTES
+
+# PIL and cloudinary are only needed by the admin upload routes, so they are
+# imported on first use (see load_cloudinary / images.py) to keep worker
+# boot fast and light.
 
 # --- Load Config ---
 
 load_dotenv("config.env")
 
-cloudinary.config(
-  cloud_name=os.getenv("CLOUD_NAME"),
-  api_key=os.getenv("API_KEY"),
-  api_secret=os.getenv("API_SECRET")
-)
-
+# Under `python server.py` the image encoder processes re-run this script as
+# "__mp_main__" (see images.get_encode_pool); they only need the module to
+# import, not the probe and boot threads below
+BOOT = __name__ != "__mp_main__"
+
+cloudinary = None
+cloudinary_lock = threading.Lock()
+
+def load_cloudinary():
+    """Imports and configures cloudinary the first time an admin route needs it."""
+    global cloudinary
+    if cloudinary is None:
+        with cloudinary_lock:
+            if cloudinary is None:
+                module = importlib.import_module("cloudinary")
+                importlib.import_module("cloudinary.uploader")
+                importlib.import_module("cloudinary.utils")
+                importlib.import_module("cloudinary.api")
+
+                module.config(
+                  cloud_name=os.getenv("CLOUD_NAME"),
+                  api_key=os.getenv("API_KEY"),
+                  api_secret=os.getenv("API_SECRET")
+                )
+                cloudinary = module
+    return cloudinary
+
+def cloudinary_upload(file, **options):
+    with metrics.cloudinary_timer("upload"):
+        return load_cloudinary().uploader.upload(file, **options)
+
+def cloudinary_destroy(public_id, **options):
+    with metrics.cloudinary_timer("destroy"):
+        return load_cloudinary().uploader.destroy(public_id, **options)
+
+def cloudinary_delete_resources(public_ids, **options):
+    with metrics.cloudinary_timer("delete_resources"):
+        return load_cloudinary().api.delete_resources(public_ids, **options)
+
+# Static files go through serve_react (see static_assets.py), not Flask's static view
 app = Flask(
     __name__,
-    static_folder="frontend/build/static",
+    static_folder=None,
     template_folder="frontend/build"
 )
 CORS(app)
+metrics.init_app(app)
 
 app.secret_key = os.getenv("SECRET_KEY")  # already hai 👍
     
 app.config["MONGO_URI"] = os.getenv("MONGO_URI")
 mongo = None
 
-def connect_db():
-    global mongo
-    try:
-        mongo = PyMongo(app)
-        print("✅ MongoDB connected")
-    except PyMongoError as e:
-        mongo = None
-        print("⚠️ MongoDB connection failed:")
-
-
-connect_db()
+# Registered before PyMongo builds its client so every command is timed
+metrics.register_mongo_listener()
+
+# One pooled client per worker; the breaker fails fast while Mongo is down
+db_manager = DatabaseManager(
+    app,
+    probe_interval=float(os.getenv("MONGO_PROBE_INTERVAL", 10)),
+    failure_threshold=int(os.getenv("MONGO_FAILURE_THRESHOLD", 3)),
+    max_backoff=float(os.getenv("MONGO_MAX_BACKOFF", 30)),
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    serverSelectionTimeoutMS=int(os.getenv("MONGO_SELECT_TIMEOUT_MS", 2000)),
+    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 2000)),
+    socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000)),
+    waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+)
+mongo = db_manager.mongo
+if BOOT:
+    db_manager.start_probe()
 
 # Email Configuration (EmailJS)
 # Make sure these exist in config.env
@@ -76,6 +127,30 @@ serializer = URLSafeTimedSerializer(app.secret_key)
 
 EMAIL_REGEX = r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$"
 
+# Rate Limits ("<count>/<seconds>" per route)
+# memory → per worker, mongo → shared across gunicorn workers via a TTL collection
+RATE_LIMITS = {
+    "messages": parse_limit(os.getenv("RATE_LIMIT_MESSAGES", "1/600")),
+}
+
+# gunicorn.conf.py exports its worker count; per-worker counters would let
+# each worker allow the full limit, so several workers default to mongo
+web_workers = int(os.getenv("WEB_CONCURRENCY", 1))
+rate_limit_kind = os.getenv("RATE_LIMIT_BACKEND", "mongo" if web_workers > 1 else "memory")
+
+if rate_limit_kind == "memory" and web_workers > 1:
+    raise RuntimeError(
+        f"RATE_LIMIT_BACKEND=memory keeps separate counters in each of the {web_workers} workers, "
+        "use RATE_LIMIT_BACKEND=mongo or WEB_CONCURRENCY=1"
+    )
+
+if rate_limit_kind == "mongo":
+    rate_limit_backend = MongoBackend(lambda: mongo.db)
+else:
+    rate_limit_backend = MemoryBackend()
+
+rate_limiter = RateLimiter(rate_limit_backend, RATE_LIMITS)
+
 #-------------------------------------------------------
 #----------- Helper Functions -----------------------
 #-------------------------------------------------------
@@ -107,50 +182,509 @@ def verify_block_token(token, expiration=86400*30): # 30 days valid
     except Exception:
         return None
 
-def is_rate_limited(ip):
-    window = datetime.utcnow() - timedelta(minutes=10)
+def is_rate_limited(ip, route="messages"):
+    return rate_limiter.is_limited(route, ip)
+
+def encode_cursor(data):
+    """Packs the sort key of the last returned document into an opaque token."""
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Reverses encode_cursor. Returns None for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+def int_arg(name, default, minimum, maximum=None):
+    """Query string integer clamped to [minimum, maximum]; None when it isn't a number."""
+    try:
+        value = max(minimum, int(request.args.get(name, default)))
+    except ValueError:
+        return None
+    return value if maximum is None else min(maximum, value)
+
+def media_after_filter(cursor):
+    """Keyset filter for media sorted by _id descending."""
+    data = decode_cursor(cursor)
+    if not data or not ObjectId.is_valid(data.get("id", "")):
+        return None
+    return {"_id": {"$lt": ObjectId(data["id"])}}
+
+def messages_after_filter(cursor):
+    """Keyset filter for messages sorted by (created_at, _id) descending."""
+    data = decode_cursor(cursor)
+    if not data or not ObjectId.is_valid(data.get("id", "")):
+        return None
+
+    last_id = ObjectId(data["id"])
+    if data.get("t") is None:
+        # Records without created_at sort last, only walk those by _id
+        return {"created_at": None, "_id": {"$lt": last_id}}
+
+    try:
+        last_time = datetime.fromisoformat(data["t"])
+    except (TypeError, ValueError):
+        return None
+
+    return {"$or": [
+        {"created_at": {"$lt": last_time}},
+        {"created_at": last_time, "_id": {"$lt": last_id}},
+        {"created_at": None}
+    ]}
+
+# List endpoints only read these fields, so nothing else crosses the wire
+# (variant public ids, job ids and timestamps stay in Mongo)
+MEDIA_LIST_PROJECTION = {
+    "title": 1, "file_type": 1, "description": 1, "skills": 1, "url": 1,
+    "poster_id": 1, "poster_url": 1, "variants.url": 1, "variants.width": 1
+}
+MESSAGE_LIST_PROJECTION = {
+    "name": 1, "email": 1, "preview": 1, "entry_count": 1, "status": 1,
+    "created_at": 1, "ip": 1,
+    # Only present on legacy documents that predate `preview`
+    "message": 1
+}
+
+def json_response(payload, status=200, headers=None):
+    """Encodes with serialize.dumps (orjson when available) instead of Flask's
+    BSON-aware provider; bytes bodies can go straight into the response cache."""
+    body = payload if isinstance(payload, bytes) else serialize.dumps(payload)
+    return app.response_class(body, status=status, headers=headers, mimetype="application/json")
+
+def media_row(m):
+    return {
+        "id": str(m["_id"]),
+        "title": m["title"],
+        "file_type": m["file_type"],
+        "description": m["description"],
+        "skills": m["skills"],
+        "url": m["url"],
+        "poster_id": m.get("poster_id", ""),
+        "poster_url": m.get("poster_url", ""),
+        "srcset": [
+            {"url": v["url"], "width": v["width"]}
+            for v in m.get("variants", [])
+        ]
+    }
+
+def message_row(m):
+    # List rows carry the latest entry's preview, the thread is paged separately
+    preview = m.get("preview", m.get("message", ""))
+    return {
+        "id": str(m["_id"]),
+        "name": m["name"],
+        "email": m["email"],
+        "message": preview,
+        "preview": preview,
+        "entry_count": m.get("entry_count", 1),
+        "status": m["status"],
+        "created_at": m.get("created_at"),
+        "ip": m.get("ip")
+    }
+
+# Message threads are stored append-only: each submission is one element of
+# `entries`, with `entry_count` and a short `preview` of the latest one kept
+# alongside so list views never load the whole thread.
+PREVIEW_CHARS = 280
+
+def thread_entry(text, created_at):
+    return {"text": text, "created_at": created_at}
 
-    count = mongo.db.message.count_documents({
+def thread_preview(text):
+    return text[:PREVIEW_CHARS]
+
+def new_thread_fields(name, text, ip, now):
+    return {
+        "name": name,
+        "entries": [thread_entry(text, now)],
+        "entry_count": 1,
+        "preview": thread_preview(text),
         "ip": ip,
-        "created_at": {"$gte": window}
+        "created_at": now
+    }
+
+# Before threads, follow-ups were joined into one `message` string
+LEGACY_SEPARATOR = "\n\n---\n\n"
+
+# What the status lookup in /messages reads; `message` and `entry_count`
+# tell an unmigrated thread apart (see legacy_entries)
+STATUS_LOOKUP_PROJECTION = {"status": 1, "message": 1, "entry_count": 1, "created_at": 1}
+
+def legacy_entries(doc):
+    """Entries of a document migrate_threads.py hasn't converted yet, split the
+    same way the migration does; [] for every other document."""
+    if "message" not in doc or "entry_count" in doc:
+        return []
+    entries = [thread_entry(text, None) for text in (doc["message"] or "").split(LEGACY_SEPARATOR)]
+    entries[-1]["created_at"] = doc.get("created_at")
+    return entries
+
+def append_thread_update(text, now, legacy=()):
+    """Appends one entry. `legacy` entries (legacy_entries of the same
+    document) go in first, in the same write, so no history is lost."""
+    entries = [*legacy, thread_entry(text, now)]
+    update = {
+        "$push": {"entries": {"$each": entries}},
+        "$inc": {"entry_count": len(entries)},
+        "$set": {
+            "preview": thread_preview(text),
+            "status": "pending",
+            "created_at": now
+        }
+    }
+    if legacy:
+        update["$unset"] = {"message": ""}
+    return update
+
+def thread_append_filter(doc):
+    query = {"_id": doc["_id"], "status": "responded"}
+    if "entry_count" not in doc:
+        # Converted at most once, even with concurrent follow-ups
+        query["entry_count"] = {"$exists": False}
+    return query
+
+def media_next_cursor(last):
+    return encode_cursor({"id": str(last["_id"])})
+
+def messages_next_cursor(last):
+    created_at = last.get("created_at")
+    return encode_cursor({
+        "t": created_at.isoformat() if created_at else None,
+        "id": str(last["_id"])
     })
 
-    return count >= 1
+def client_ip(headers, remote_addr):
+    # ip = request.headers.get("X-Forwarded-For", request.remote_addr)
+    ip = headers.get("X-Forwarded-For", remote_addr) or ""
+    return ip.split(",")[0].strip()
+
+def submission_response(email, name, message_content, status_type, host_url):
+    """Everything the frontend needs to send the EmailJS notifications."""
+    token = generate_block_token(email)
+    block_url = f"{host_url}block_user/{token}"
+
+    return {
+        "message": "Message sent successfully!",
+        "success": True,
+        "emailjs_config": {
+            "service_id": EMAILJS_SERVICE_ID,
+            "template_id": EMAILJS_TEMPLATE_ID,
+            "public_key": EMAILJS_PUBLIC_KEY
+        },
+        "email_data": {
+            "user_name": name,
+            "user_email": email,
+            "block_url": block_url,
+            "portfolio_url": host_url,
+            "message_content": message_content,
+            "admin_email": ADMIN_EMAIL,
+            "status_type": status_type
+        }
+    }
+
+def block_queries(email):
+    """(current status, filter) pairs that together cover every record of
+    `email` not yet blocked; updating them one by one tells the stats
+    counters exactly how many records left each status."""
+    return [
+        ("pending", {"email": email, "status": "pending"}),
+        ("responded", {"email": email, "status": "responded"}),
+        (None, {"email": email, "status": {"$nin": list(MESSAGE_STATUSES)}})
+    ]
 
 def check_db():
-    global mongo
-    if not mongo:
-        connect_db()
-        return {"message": "Can't connect to database, please refresh"}, 500
-    
-def optimize_image(file):
-    img = Image.open(file)
-    img.load()
-
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-
-    # ✅ SAFE resolution (no blur)
-    MAX_SIDE = 2048   # 👈 ye key hai
-    w, h = img.size
-
-    if max(w, h) > MAX_SIDE:
-        scale = MAX_SIDE / max(w, h)
-        img = img.resize(
-            (int(w * scale), int(h * scale)),
-            Image.LANCZOS
+    db_manager.check()
+
+@app.errorhandler(DatabaseUnavailable)
+def database_unavailable(e):
+    return {"message": "Can't connect to database, please refresh"}, 503, {"Retry-After": str(e.retry_after)}
+
+@app.errorhandler(ConnectionFailure)
+def database_connection_failed(e):
+    db_manager.record_failure(e)
+    print(f"⚠️ MongoDB request failed: {e}")
+    return {"message": "Can't connect to database, please refresh"}, 503, {"Retry-After": "1"}
+
+#-------------------------------------------------------
+#----------- Upload Jobs -----------------------
+#-------------------------------------------------------
+
+def upload_poster(file):
+    """Optimizes and uploads a poster image unless the same image is already
+    on Cloudinary (see assets.py). Returns (url, public_id, hashes)."""
+    hashes = [assets.file_hash(file)]
+    existing = assets.find_poster(mongo.db.media, hashes)
+    if existing is None:
+        poster_file = optimize_image(file)
+        hashes.append(assets.bytes_hash(poster_file.getvalue()))
+        existing = assets.find_poster(mongo.db.media, hashes[1:])
+
+    if existing is not None:
+        return existing["poster_url"], existing["poster_id"], assets.merge(hashes, existing.get("poster_hashes", []))
+
+    poster_result = cloudinary_upload(
+        poster_file,
+        resource_type="image"
+    )
+    return poster_result["secure_url"], poster_result["public_id"], hashes
+
+def destroy_unreferenced(remote):
+    """Destroys the [(public_id, resource type)] that no media document uses any more."""
+    orphans = assets.unreferenced(mongo.db.media, [public_id for public_id, _ in remote])
+    for public_id, resource_type in remote:
+        if public_id in orphans:
+            try:
+                cloudinary_destroy(public_id, resource_type=resource_type)
+            except Exception as e:
+                print(f"Error deleting from Cloudinary: {e}")
+
+def process_upload_job(job, progress):
+    """Runs on the upload pool: optimize, push to Cloudinary, save metadata.
+    Content already on Cloudinary is reused instead of uploaded again."""
+    fields = job["fields"]
+    files = job["files"]
+    file_type = fields["file_type"]
+
+    variants = []
+    encoded = None
+    hashes = [assets.file_hash(files["file"])]
+    existing = assets.find_main(mongo.db.media, hashes, file_type)
+
+    if existing is None and file_type == "photo":
+        progress("optimizing", 10)
+        with open(files["file"], "rb") as f:
+            encoded = generate_variants(f)
+
+        # A different file can still encode to the same WebP
+        hashes.append(assets.bytes_hash(encoded[-1][1].getvalue()))
+        existing = assets.find_main(mongo.db.media, hashes[1:], file_type)
+
+    if existing is not None:
+        # Same content as an existing media: share its Cloudinary assets
+        progress("deduplicated", 40)
+        result = {"secure_url": existing["url"], "public_id": existing["id"]}
+        variants = existing.get("variants", [])
+        hashes = assets.merge(hashes, existing.get("hashes", []))
+    elif encoded is not None:
+        progress("uploading", 40)
+        with ThreadPoolExecutor(max_workers=len(encoded)) as pool:
+            uploaded = list(pool.map(
+                lambda variant: cloudinary_upload(variant[1], resource_type="image"),
+                encoded
+            ))
+
+        variants = [
+            {"width": width, "url": r["secure_url"], "id": r["public_id"]}
+            for (width, _), r in zip(encoded, uploaded)
+        ]
+        # The widest variant doubles as the canonical url/id
+        result = uploaded[-1]
+    else:
+        # Fallback for video if sent via file
+        progress("uploading", 20)
+        result = cloudinary_upload(
+            files["file"],
+            resource_type="video"
         )
 
-    buffer = io.BytesIO()
-    img.save(
-        buffer,
-        format="WEBP",
-        quality=82,     # 👈 sharp & safe
-        optimize=True
+    # Handle Poster Upload (Only for Video)
+    poster_url = ""
+    poster_id = ""
+    poster_hashes = []
+
+    if file_type == "video" and files.get("poster"):
+        progress("poster", 70)
+        # Optimize poster as well since it's an image
+        with open(files["poster"], "rb") as f:
+            poster_url, poster_id, poster_hashes = upload_poster(f)
+
+    progress("saving", 90)
+    # Keyed on the job so a retried job never inserts the same media twice
+    saved = mongo.db.media.update_one(
+        {"job_id": job["_id"]},
+        {"$setOnInsert": {
+            "title": fields["title"],
+            "file_type": file_type,
+            "description": fields["description"],
+            "skills": fields["skills"],
+            "url": result["secure_url"],
+            "id": result["public_id"],
+            "poster_url": poster_url,
+            "poster_id": poster_id,
+            "variants": variants,
+            "hashes": hashes,
+            "poster_hashes": poster_hashes,
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
     )
+    if saved.upserted_id:
+        stats.apply(mongo.db, stats.media_added(file_type))
+    bump_collection_version("media")
+
+    return {
+        "media_id": str(saved.upserted_id) if saved.upserted_id else None,
+        "url": result["secure_url"],
+        "poster_url": poster_url
+    }
 
-    buffer.seek(0)
-    return buffer
+upload_jobs = UploadJobQueue(
+    lambda: mongo.db.upload_jobs,
+    process_upload_job,
+    spool_dir=os.getenv("UPLOAD_SPOOL_DIR", os.path.join("uploads", "spool")),
+    max_workers=int(os.getenv("UPLOAD_WORKERS", 2)),
+    max_pending=int(os.getenv("UPLOAD_MAX_PENDING", 16)),
+    # Retrying won't make an oversized image fit
+    permanent_errors=(ImageTooLarge,)
+)
+
+def recover_upload_jobs():
+    try:
+        recovered = upload_jobs.recover_stale(int(os.getenv("UPLOAD_STALE_SECONDS", 120)))
+    except Exception as e:
+        print(f"⚠️ Upload job recovery failed: {e}")
+        return
+    if recovered:
+        print(f"⚠️ Marked {recovered} interrupted upload jobs as failed, they can be retried")
+
+# Off the boot path, like the index setup below
+if BOOT and os.getenv("UPLOAD_RECOVERY", "1") == "1":
+    threading.Thread(target=recover_upload_jobs, name="recover-upload-jobs", daemon=True).start()
+
+#-------------------------------------------------------
+#----------- Response Cache -----------------------
+#-------------------------------------------------------
+
+class ResponseCache:
+    """Small thread-safe LRU with a TTL, holds serialized JSON bodies."""
+
+    def __init__(self, max_size=256, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+media_cache = ResponseCache(
+    max_size=int(os.getenv("MEDIA_CACHE_SIZE", 256)),
+    ttl=int(os.getenv("MEDIA_CACHE_TTL", 300))
+)
+
+# Collection versions live in Mongo so every gunicorn worker sees a bump.
+# Each worker re-reads them at most once per VERSION_REFRESH seconds.
+VERSION_REFRESH = float(os.getenv("VERSION_REFRESH", 2))
+collection_versions = {}
+versions_lock = threading.Lock()
+
+def get_collection_state(name):
+    """(version, modified_at) of a collection; modified_at is None until the
+    first bump."""
+    now = time.monotonic()
+    with versions_lock:
+        cached = collection_versions.get(name)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    doc = mongo.db.counters.find_one({"_id": name}) or {}
+    version, modified_at = doc.get("version", 0), doc.get("modified_at")
+
+    with versions_lock:
+        collection_versions[name] = (now + VERSION_REFRESH, version, modified_at)
+    return version, modified_at
+
+def get_collection_version(name):
+    return get_collection_state(name)[0]
+
+def bump_collection_version(name):
+    doc = mongo.db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$set": {"modified_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    with versions_lock:
+        collection_versions[name] = (time.monotonic() + VERSION_REFRESH, doc["version"], doc["modified_at"])
+
+    if name == "media":
+        media_cache.clear()
+    return doc["version"]
+
+# Part of every list ETag; bump it when a list response changes shape so
+# clients holding an old body don't get a 304 for it after a deploy
+LIST_FORMAT = 2
+
+def list_validators(collection, version, modified_at, cache_control):
+    """Strong ETag and Last-Modified for a list endpoint. The body of a given
+    URL only changes when the collection's version does."""
+    headers = {
+        "ETag": f'"{collection}-{LIST_FORMAT}-{version}"',
+        "Cache-Control": cache_control
+    }
+    if modified_at is not None:
+        headers["Last-Modified"] = http_date(modified_at.replace(tzinfo=timezone.utc))
+    return headers
+
+def is_not_modified(headers, if_none_match, if_modified_since):
+    """If-None-Match wins when present (weak comparison, so an ETag a proxy
+    weakened while compressing still matches); If-Modified-Since is the fallback."""
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(headers["ETag"].strip('"'))
+    if if_modified_since and "Last-Modified" in headers:
+        since = parse_date(if_modified_since)
+        return since is not None and parse_date(headers["Last-Modified"]) <= since
+    return False
+
+def conditional_list(collection, cache_control):
+    """Returns (version, validator headers, 304 response or None) for the
+    current request. The 304 is decided before any query runs, so callers
+    validate their query arguments first."""
+    version, modified_at = get_collection_state(collection)
+    headers = list_validators(collection, version, modified_at, cache_control)
+    if is_not_modified(headers, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")):
+        return version, headers, app.response_class(status=304, headers=headers)
+    return version, headers, None
 
 #-------------------------------------------------------
 #----------- Public Routes -----------------------
@@ -174,92 +708,72 @@ def messages():
     # -----------------------------
     # RATE LIMIT (TOP PRIORITY)
     # -----------------------------
-    # ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-    ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-    ip = ip.split(",")[0].strip()
+    ip = client_ip(request.headers, request.remote_addr)
 
     if is_rate_limited(ip):
         return {"message": "Too many messages sent. Please try again later."}, 429
 
     # -----------------------------
-    # 1. BLOCKED USER CHECK
+    # 1. ONE LOOKUP FOR EVERY STATUS RECORD OF THIS EMAIL
     # -----------------------------
-    blocked_user = mongo.db.message.find_one({
-        "email": email,
-        "status": "blocked"
-    })
-    if blocked_user:
-        return {"message": "You have blocked emails from us. No message sent."}, 403
+    records = mongo.db.message.find(
+        {"email": email, "status": {"$in": ["blocked", "pending", "responded"]}},
+        STATUS_LOOKUP_PROJECTION
+    )
+    by_status = {}
+    for r in records:
+        by_status.setdefault(r["status"], r)
 
     # -----------------------------
-    # 2. PENDING CHECK
+    # 2. BLOCKED USER CHECK
     # -----------------------------
-    mpending = mongo.db.message.find_one({
-        "email": email,
-        "status": "pending"
-    })
-    if mpending:
-        return {"message": "You have a pending message. Please wait for a response."}, 400
+    if "blocked" in by_status:
+        return {"message": "You have blocked emails from us. No message sent."}, 403
 
     # -----------------------------
-    # 3. RESPONDED → APPEND MESSAGE
+    # 3. PENDING CHECK
     # -----------------------------
-    mresponded = mongo.db.message.find_one({
-        "email": email,
-        "status": "responded"
-    })
+    if "pending" in by_status:
+        return {"message": "You have a pending message. Please wait for a response."}, 400
 
     status_type = "NEW" # Default for admin notification logic
 
-    if mresponded:
-        mongo.db.message.update_one(
-            {"_id": mresponded["_id"]},
-            {"$set": {
-                "message": mresponded["message"] + "\n\n---\n\n" + message_content,
-                "status": "pending",
-                "created_at": datetime.utcnow()
-            }}
+    if "responded" in by_status:
+        # -----------------------------
+        # 4. RESPONDED → APPEND MESSAGE
+        # -----------------------------
+        # Append-only: the earlier entries are never read or rewritten
+        responded = by_status["responded"]
+        updated = mongo.db.message.find_one_and_update(
+            thread_append_filter(responded),
+            append_thread_update(message_content, datetime.utcnow(), legacy_entries(responded)),
+            projection={"_id": 1}
         )
+        if updated is None:
+            # Another submission flipped it to pending in the meantime
+            return {"message": "You have a pending message. Please wait for a response."}, 400
+        stats.apply(mongo.db, stats.message_moved("responded", "pending"))
+        bump_collection_version("message")
         status_type = "RESPONDED"
     else:
         # -----------------------------
-        # 4. NEW MESSAGE
+        # 5. NEW MESSAGE
         # -----------------------------
-        mongo.db.message.insert_one({
-            "name": name,
-            "email": email,
-            "message": message_content,
-            "status": "pending",
-            "ip": ip,
-            "created_at": datetime.utcnow()
-        })
+        # Upsert on (email, pending) so concurrent submissions create one record
+        result = mongo.db.message.update_one(
+            {"email": email, "status": "pending"},
+            {"$setOnInsert": new_thread_fields(name, message_content, ip, datetime.utcnow())},
+            upsert=True
+        )
+        if result.upserted_id is None:
+            return {"message": "You have a pending message. Please wait for a response."}, 400
+        stats.apply(mongo.db, stats.message_added("pending"))
+        bump_collection_version("message")
 
     # -----------------------------
     # PREPARE DATA FOR FRONTEND (EmailJS)
     # -----------------------------
-    
-    token = generate_block_token(email)
-    block_url = f"{request.host_url}block_user/{token}"
-    
-    # Return everything frontend needs to send emails
-    return {
-        "message": "Message sent successfully!",
-        "success": True,
-        "emailjs_config": {
-            "service_id": EMAILJS_SERVICE_ID,
-            "template_id": EMAILJS_TEMPLATE_ID,
-            "public_key": EMAILJS_PUBLIC_KEY
-        },
-        "email_data": {
-            "user_name": name,
-            "user_email": email,
-            "block_url": block_url,
-            "portfolio_url": request.host_url,
-            "message_content": message_content,
-            "admin_email": ADMIN_EMAIL,
-            "status_type": status_type
-        }
-    }, 200
+    return submission_response(email, name, message_content, status_type, request.host_url), 200
 
 @app.route("/block_user/<token>", methods=["GET"])
 def block_user(token):
@@ -267,14 +781,19 @@ def block_user(token):
     if not email:
         return "Invalid or expired link. Please try sending a new message to get a fresh link.", 400
     
-    mongo.db.message.update_many(
-        {"email": email},
-        {"$set": {"status": "blocked"}}
-    )
+    deltas = Counter()
+    for status, query in block_queries(email):
+        moved = mongo.db.message.update_many(query, {"$set": {"status": "blocked"}}).modified_count
+        deltas.update(stats.message_moved(status, "blocked", moved))
     
     # If no record exists (e.g. they somehow deleted all messages but still have link), insert one to track block
     if mongo.db.message.count_documents({"email": email}) == 0:
         mongo.db.message.insert_one({"email": email, "status": "blocked"})
+        deltas.update(stats.message_added("blocked"))
+
+    stats.apply(mongo.db, deltas)
+    if any(deltas.values()):
+        bump_collection_version("message")
 
     return get_template_content("block_success.html")
 
@@ -284,40 +803,150 @@ def fetch_media():
     page = int(request.args.get("page", 1))
     limit = int(request.args.get("limit", 10))
     media_type = request.args.get("type", "all")  # all | video | photo
+    after = request.args.get("after")
+
+    # A malformed cursor is an error whether or not the list changed
+    after_filter = media_after_filter(after) if after else None
+    if after and after_filter is None:
+        return {"message": "Invalid cursor"}, 400
 
-    skip = (page - 1) * limit
+    # Nothing changed since the client's copy: answer before touching the cache or Mongo
+    version, validators, not_modified = conditional_list("media", "public, no-cache")
+    if not_modified is not None:
+        return not_modified
+
+    # Serve from cache while the media collection is unchanged
+    cache_key = (media_type, after or page, limit, version)
+    cached = media_cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached, headers=validators)
 
     # 🔑 Conditional filter
     query = {}
     if media_type != "all":
         query["file_type"] = media_type   # "video" or "photo"
 
+    # Keyset pagination when a cursor is given, page/skip as fallback
+    skip = 0
+    if after:
+        query.update(after_filter)
+    else:
+        skip = (page - 1) * limit
+
     cursor = (
-        mongo.db.media.find(query)
+        mongo.db.media.find(query, MEDIA_LIST_PROJECTION)
         .sort("_id", -1)
         .skip(skip)
         .limit(limit)
     )
 
     media = []
+    last = None
     for m in cursor:
-        media.append({
-            "id": str(m["_id"]),
-            "title": m["title"],
-            "file_type": m["file_type"],
-            "description": m["description"],
-            "skills": m["skills"],
-            "url": m["url"],
-            "poster_id": m.get("poster_id", ""),
-            "poster_url": m.get("poster_url", "")
-        })
+        last = m
+        media.append(media_row(m))
 
-    return {
+    next_cursor = None
+    if last is not None and len(media) == limit:
+        next_cursor = media_next_cursor(last)
+
+    body = serialize.dumps({
         "page": page,
         "limit": limit,
         "count": len(media),
-        "data": media
+        "data": media,
+        "next_cursor": next_cursor
+    })
+    media_cache.set(cache_key, body)
+
+    return json_response(body, headers=validators)
+
+SEARCH_MAX_LIMIT = 50
+skill_facets_cache = {}
+
+def skill_facets():
+    """Per-skill and per-type media counts, computed once per media version."""
+    version = get_collection_version("media")
+    cached = skill_facets_cache.get("facets")
+    if cached and cached[0] == version:
+        return cached[1]
+
+    result = next(mongo.db.media.aggregate([
+        {"$facet": {
+            "skills": [
+                {"$unwind": "$skills"},
+                {"$group": {"_id": "$skills", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}}
+            ],
+            "types": [
+                {"$group": {"_id": "$file_type", "count": {"$sum": 1}}}
+            ]
+        }}
+    ]), {"skills": [], "types": []})
+
+    facets = {
+        "skills": [{"skill": f["_id"], "count": f["count"]} for f in result["skills"]],
+        "types": {f["_id"]: f["count"] for f in result["types"]}
     }
+    skill_facets_cache["facets"] = (version, facets)
+    return facets
+
+@app.route("/fetch/media/search", methods=["GET"])
+def search_media():
+    """Keyword search (text index, ranked by relevance) with optional
+    skill and type filters. ?q=...&skill=...&type=...&offset=&limit="""
+    check_db()
+    q = request.args.get("q", "").strip()
+    skill = request.args.get("skill", "").strip()
+    media_type = request.args.get("type", "all")
+    offset = max(0, int(request.args.get("offset", 0)))
+    limit = min(SEARCH_MAX_LIMIT, max(1, int(request.args.get("limit", 10))))
+
+    if not q and not skill:
+        return {"message": "Search text or skill required"}, 400
+
+    version = get_collection_version("media")
+    cache_key = ("search", q, skill, media_type, offset, limit, version)
+    cached = media_cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+
+    query = {}
+    if q:
+        query["$text"] = {"$search": q}
+    if skill:
+        query["skills"] = skill
+    if media_type != "all":
+        query["file_type"] = media_type
+
+    if q:
+        cursor = mongo.db.media.find(query, {**MEDIA_LIST_PROJECTION, "score": {"$meta": "textScore"}}) \
+            .sort([("score", {"$meta": "textScore"})])
+    else:
+        cursor = mongo.db.media.find(query, MEDIA_LIST_PROJECTION).sort("_id", -1)
+
+    results = []
+    for m in cursor.skip(offset).limit(limit):
+        row = media_row(m)
+        row["score"] = round(m.get("score", 0), 4)
+        results.append(row)
+
+    body = serialize.dumps({
+        "q": q,
+        "skill": skill,
+        "offset": offset,
+        "limit": limit,
+        "count": len(results),
+        "data": results
+    })
+    media_cache.set(cache_key, body)
+
+    return json_response(body)
+
+@app.route("/fetch/media/facets", methods=["GET"])
+def media_facets():
+    check_db()
+    return skill_facets(), 200
 
 #-------------------------------------------------------
 #----------- Admin Routes -----------------------
@@ -360,34 +989,199 @@ def get_messages():
 
     page = int(request.args.get("page", 1))
     limit = int(request.args.get("limit", 10))
+    after = request.args.get("after")
 
-    skip = (page - 1) * limit
+    # A malformed cursor is an error whether or not the list changed
+    after_filter = messages_after_filter(after) if after else None
+    if after and after_filter is None:
+        return {"message": "Invalid cursor"}, 400
 
-    cursor = mongo.db.message.find() \
-        .sort("created_at", -1) \
+    _, validators, not_modified = conditional_list("message", "private, no-cache")
+    if not_modified is not None:
+        return not_modified
+
+    # Keyset pagination when a cursor is given, page/skip as fallback
+    query = {}
+    skip = 0
+    if after:
+        query = after_filter
+    else:
+        skip = (page - 1) * limit
+
+    cursor = mongo.db.message.find(query, MESSAGE_LIST_PROJECTION) \
+        .sort([("created_at", -1), ("_id", -1)]) \
         .skip(skip) \
         .limit(limit)
 
     messages = []
+    last = None
     for m in cursor:
-        messages.append({
-            "id": str(m["_id"]),
-            "name": m["name"],
-            "email": m["email"],
-            "message": m["message"],
-            "status": m["status"],
-            "created_at": m.get("created_at"),
-            "ip": m.get("ip")
+        last = m
+        messages.append(message_row(m))
 
-        })
+    next_cursor = None
+    if last is not None and len(messages) == limit:
+        next_cursor = messages_next_cursor(last)
 
-    return {
+    return json_response({
         "page": page,
         "limit": limit,
         "count": len(messages),
-        "data": messages
+        "data": messages,
+        "next_cursor": next_cursor
+    }, headers=validators)
+
+ENTRIES_MAX_LIMIT = 100
+
+@app.route("/admin/messages/<message_id>/entries", methods=["GET"])
+def get_message_entries(message_id):
+    """Pages through one thread, oldest entry first."""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    if not ObjectId.is_valid(message_id):
+        return {"message": "Invalid message ID"}, 400
+
+    offset = int_arg("offset", 0, 0)
+    limit = int_arg("limit", 20, 1, ENTRIES_MAX_LIMIT)
+    if offset is None or limit is None:
+        return {"message": "Invalid offset or limit"}, 400
+
+    m = mongo.db.message.find_one(
+        {"_id": ObjectId(message_id)},
+        {"entries": {"$slice": [offset, limit]}, "entry_count": 1, "message": 1, "created_at": 1}
+    )
+    if not m:
+        return {"message": "Message not found"}, 404
+
+    legacy = legacy_entries(m)
+    if legacy:
+        # Not migrated yet, split the blob the way the migration will
+        entries = legacy[offset:offset + limit]
+        total = len(legacy)
+    else:
+        entries = m.get("entries", [])
+        total = m.get("entry_count", len(entries))
+
+    return {
+        "id": message_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "count": len(entries),
+        "data": entries
     }
 
+EXPORT_BATCH = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_COLUMNS = ("id", "email", "name", "status", "created_at", "ip", "entry_count", "preview")
+
+def export_row(m, with_entries):
+    row = {
+        "id": str(m["_id"]),
+        "email": m.get("email"),
+        "name": m.get("name"),
+        "status": m.get("status"),
+        "created_at": m.get("created_at"),
+        "ip": m.get("ip"),
+        "entry_count": m.get("entry_count", 1 if m.get("message") else 0),
+        "preview": m.get("preview", (m.get("message") or "")[:PREVIEW_CHARS])
+    }
+    if with_entries:
+        row["entries"] = m.get("entries") or (
+            [thread_entry(m["message"], m.get("created_at"))] if m.get("message") else []
+        )
+    return row
+
+def export_lines(cursor, fmt, with_entries):
+    """Yields the export in ~64KB chunks, one document in memory at a time."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS + (("entries",) if with_entries else ()))
+
+    for m in cursor:
+        row = export_row(m, with_entries)
+        if writer is None:
+            buffer.write(serialize.dumps(row).decode("utf-8"))
+            buffer.write("\n")
+        else:
+            values = [row[c] for c in EXPORT_COLUMNS]
+            if row["created_at"]:
+                values[EXPORT_COLUMNS.index("created_at")] = serialize.default(row["created_at"])
+            if with_entries:
+                values.append(serialize.dumps(row["entries"]).decode("utf-8"))
+            writer.writerow(values)
+
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route("/admin/messages/export", methods=["GET"])
+def export_messages():
+    """Streams the whole inbox, oldest first, from one batched cursor.
+
+    ?format=ndjson|csv &status=pending,responded &from=&to= (ISO dates, `to`
+    exclusive) &entries=1 (include full threads) &after_id=<last exported id>
+    to resume an interrupted download.
+    """
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return {"message": "format must be ndjson or csv"}, 400
+
+    query = {}
+
+    statuses = [s for s in request.args.get("status", "").split(",") if s]
+    if any(s not in MESSAGE_STATUSES for s in statuses):
+        return {"message": f"status must be one of {', '.join(MESSAGE_STATUSES)}"}, 400
+    if statuses:
+        query["status"] = {"$in": statuses}
+
+    created = {}
+    for param, op in (("from", "$gte"), ("to", "$lt")):
+        if request.args.get(param):
+            try:
+                created[op] = datetime.fromisoformat(request.args[param])
+            except ValueError:
+                return {"message": f"Invalid '{param}' date"}, 400
+    if created:
+        query["created_at"] = created
+
+    after_id = request.args.get("after_id")
+    if after_id:
+        if not ObjectId.is_valid(after_id):
+            return {"message": "Invalid after_id"}, 400
+        query["_id"] = {"$gt": ObjectId(after_id)}
+
+    with_entries = request.args.get("entries", "1" if fmt == "ndjson" else "0") == "1"
+    projection = None if with_entries else {"entries": 0}
+
+    # _id order makes after_id resumption exact and rides the _id index
+    cursor = mongo.db.message.find(query, projection) \
+        .sort("_id", 1) \
+        .batch_size(EXPORT_BATCH)
+
+    filename = f"messages-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        export_lines(cursor, fmt, with_entries),
+        mimetype="application/x-ndjson" if fmt == "ndjson" else "text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            # Don't let a fronting proxy buffer the whole export
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @app.route("/admin/generate-signature", methods=["POST"])
 def generate_signature():
     if not require_admin_login():
@@ -406,7 +1200,7 @@ def generate_signature():
              params_to_sign["folder"] = folder
 
         # Generate Signature
-        signature = cloudinary.utils.api_sign_request(
+        signature = load_cloudinary().utils.api_sign_request(
             params_to_sign, 
             os.getenv("API_SECRET")
         )
@@ -463,6 +1257,8 @@ def upload_media():
             "poster_id": poster_id,
             "created_at": datetime.utcnow()
         })
+        stats.apply(mongo.db, stats.media_added(file_type))
+        bump_collection_version("media")
 
         return {"message": "Video meta-data saved successfully!"}, 200
     
@@ -472,51 +1268,65 @@ def upload_media():
     if not file:
          return {"message": "No file uploaded"}, 400
 
-    # Optimize image before upload
-    if file_type == "photo":
-        file = optimize_image(file)
-        result = cloudinary.uploader.upload(
-            file,
-            resource_type="image"
-        )
-    elif file_type == "video":
-        # Fallback for video if sent via file
-        result = cloudinary.uploader.upload(
-            file,
-            resource_type="video"
-        )
-    
-    # Handle Poster Upload (Only for Video)
-    poster_url = ""
-    poster_id = ""
-    
+    if file_type == "photo" and (request.content_length or 0) > MAX_IMAGE_BYTES:
+        return {"message": "Image is too large."}, 413
+
+    # Heavy work (optimize + Cloudinary + insert) runs in the background
+    files = {"file": file}
     if file_type == "video":
-        poster_file = request.files.get("poster")
-        if poster_file:
-            # Optimize poster as well since it's an image
-            poster_file = optimize_image(poster_file)
-            poster_result = cloudinary.uploader.upload(
-                poster_file,
-                resource_type="image"
-            )
-            poster_url = poster_result["secure_url"]
-            poster_id = poster_result["public_id"]
-
-    # result = cloudinary.uploader.upload(file)
-
-    mongo.db.media.insert_one({
-        "title": title,
-        "file_type": file_type,
-        "description": description,
-        "skills": skills,
-        "url": result["secure_url"],
-        "id": result["public_id"],
-        "poster_url": poster_url,
-        "poster_id": poster_id,
-        "created_at": datetime.utcnow() 
-    })
+        files["poster"] = request.files.get("poster")
+
+    try:
+        job_id = upload_jobs.submit(
+            {
+                "title": title,
+                "file_type": file_type,
+                "description": description,
+                "skills": skills
+            },
+            files
+        )
+    except QueueFull:
+        return {"message": "Upload queue is full, please try again shortly."}, 503
 
-    return {"message": "Media uploaded successfully!"}, 200
+    return {"message": "Upload queued, processing in background.", "job_id": job_id}, 202
+
+@app.route("/admin/upload/status/<job_id>", methods=["GET"])
+def upload_status(job_id):
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    job = upload_jobs.status(job_id)
+    if not job:
+        return {"message": "Job not found"}, 404
+
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "attempts": job["attempts"],
+        "error": job.get("error"),
+        "retriable": job["status"] == "failed" and job.get("retriable", True),
+        "result": job.get("result"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at")
+    }, 200
+
+@app.route("/admin/upload/retry/<job_id>", methods=["POST"])
+def retry_upload(job_id):
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    try:
+        if not upload_jobs.retry(job_id):
+            return {"message": "Job not found or cannot be retried"}, 404
+    except QueueFull:
+        return {"message": "Upload queue is full, please try again shortly."}, 503
+
+    return {"message": "Upload re-queued.", "job_id": job_id}, 202
 
 @app.route("/admin/respond", methods=["POST"])
 def respond_to_message():
@@ -531,18 +1341,22 @@ def respond_to_message():
     if not message_id or not response_text:
         return {"message": "Message ID and Response required"}, 400
 
-    # Update the message with the response
-    result = mongo.db.message.update_one(
-        {"_id": ObjectId(message_id)},
+    # Update the message with the response; the old status feeds the counters
+    before = mongo.db.message.find_one_and_update(
+        {"_id": ObjectId(message_id), "status": {"$ne": response_text}},
         {
             "$set": {
                 "status": response_text            }
-        }
+        },
+        projection={"status": 1}
     )
 
-    if result.modified_count == 0:
+    if before is None:
         return {"message": "Message not found or already responded to"}, 404
 
+    stats.apply(mongo.db, stats.message_moved(before.get("status"), response_text))
+    bump_collection_version("message")
+
     return {"message": "Response sent successfully!"}, 200
 
 @app.route("/admin/block", methods=["POST"])
@@ -558,18 +1372,22 @@ def block_to_message():
     if not message_id:
         return {"message": "Message ID required"}, 400
 
-    result = mongo.db.message.update_one(
-        {"_id": ObjectId(message_id)},
+    before = mongo.db.message.find_one_and_update(
+        {"_id": ObjectId(message_id), "status": {"$ne": data.get("status")}},
         {
             "$set": {
                 "status": data.get("status")
             }
-        }
+        },
+        projection={"status": 1}
     )
 
-    if result.modified_count == 0:
+    if before is None:
         return {"message": "Message not found or already responded to"}, 404
 
+    stats.apply(mongo.db, stats.message_moved(before.get("status"), data.get("status")))
+    bump_collection_version("message")
+
     return {"message": "Status Updated successfully!"}, 200
 
 @app.route("/admin/delete_media", methods=["POST"])
@@ -584,22 +1402,15 @@ def delete_media():
     if not media_id:
         return {"message": "Media ID required"}, 400
 
-    media = mongo.db.media.find_one({"_id": ObjectId(media_id)})
+    media = mongo.db.media.find_one_and_delete({"_id": ObjectId(media_id)})
     if not media:
         return {"message": "Media not found"}, 404
 
-    try:
-        cloudinary.uploader.destroy(media["id"], resource_type=media["file_type"]) # Explicit type usually safer
-        
-        # Delete Poster if exists
-        if media.get("poster_id"):
-             cloudinary.uploader.destroy(media["poster_id"], resource_type="image")
-
-    except Exception as e:
-        print(f"Error deleting from Cloudinary: {e}")
-
-    mongo.db.media.delete_one({"_id": ObjectId(media_id)})
+    stats.apply(mongo.db, stats.media_removed(media["file_type"]))
+    bump_collection_version("media")
 
+    # Assets shared with other media stay until their last user is deleted
+    destroy_unreferenced(assets.remote_assets(media))
 
     return {"message": "Media deleted successfully!"}, 200
 
@@ -615,11 +1426,17 @@ def delete_message():
     if not message_id:
         return {"message": "Message ID required"}, 400
 
-    result = mongo.db.message.delete_one({"_id": ObjectId(message_id)})
+    deleted = mongo.db.message.find_one_and_delete(
+        {"_id": ObjectId(message_id)},
+        projection={"status": 1}
+    )
 
-    if result.deleted_count == 0:
+    if deleted is None:
         return {"message": "Message not found"}, 404
 
+    stats.apply(mongo.db, stats.message_removed(deleted.get("status")))
+    bump_collection_version("message")
+
     return {"message": "Message deleted successfully!"}, 200
 
 @app.route("/admin/edit_media", methods=["POST"])
@@ -654,26 +1471,23 @@ def edit_media():
 
     # Handle Poster Update
     poster_file = request.files.get("poster")
+    old_poster_id = None
     if poster_file:
         # Find existing to delete old poster
-        current_media = mongo.db.media.find_one({"_id": ObjectId(media_id)})
+        current_media = mongo.db.media.find_one({"_id": ObjectId(media_id)}, {"poster_id": 1})
         
-        # Upload new
-        poster_file = optimize_image(poster_file)
-        poster_result = cloudinary.uploader.upload(
-            poster_file,
-            resource_type="image"
-        )
+        # Upload new (or reuse an identical poster)
+        try:
+            poster_url, poster_id, poster_hashes = upload_poster(poster_file)
+        except ImageTooLarge as e:
+            return {"message": str(e)}, 413
         
-        update_fields["poster_url"] = poster_result["secure_url"]
-        update_fields["poster_id"] = poster_result["public_id"]
+        update_fields["poster_url"] = poster_url
+        update_fields["poster_id"] = poster_id
+        update_fields["poster_hashes"] = poster_hashes
 
-        # Delete old if exists
-        if current_media and current_media.get("poster_id"):
-             try:
-                cloudinary.uploader.destroy(current_media["poster_id"], resource_type="image")
-             except Exception as e:
-                print(f"Failed to delete old poster: {e}")
+        if current_media and current_media.get("poster_id") != poster_id:
+            old_poster_id = current_media.get("poster_id")
 
     result = mongo.db.media.update_one(
         {"_id": ObjectId(media_id)},
@@ -683,40 +1497,344 @@ def edit_media():
     if result.matched_count == 0:
          return {"message": "Media not found"}, 404
 
+    bump_collection_version("media")
+
+    # Delete old poster once nothing shows it any more
+    if old_poster_id:
+        destroy_unreferenced([(old_poster_id, "image")])
+
     # Return updated doc or fields so frontend can update state fully
     # Or just return success
     return {"message": "Media updated successfully!", "poster_url": update_fields.get("poster_url", "")}, 200
 
 
+#-------------------------------------------------------
+#----------- Bulk Admin Routes -----------------------
+#-------------------------------------------------------
+
+MESSAGE_STATUSES = stats.MESSAGE_STATUSES
+BULK_LIMIT = 1000
+CLOUDINARY_BATCH = 100   # delete_resources accepts at most 100 ids per call
+
+def run_bulk(collection, items, ops):
+    """Applies `ops` ([(item index, operation)]) with one unordered bulk_write
+    and marks the matching items failed on write errors."""
+    if not ops:
+        return
+    try:
+        collection.bulk_write([op for _, op in ops], ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            item = items[ops[error["index"]][0]]
+            item["ok"] = False
+            item["error"] = error.get("errmsg", "write failed")
+
+@app.route("/admin/bulk/messages", methods=["POST"])
+def bulk_messages():
+    """Body: {"operations": [{"_id": ..., "action": "status", "status": ...},
+                             {"_id": ..., "action": "delete"}]}"""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    operations = (request.json or {}).get("operations") or []
+    if not operations:
+        return {"message": "Operations required"}, 400
+    if len(operations) > BULK_LIMIT:
+        return {"message": f"At most {BULK_LIMIT} operations per request"}, 400
+
+    items = []
+    seen = set()
+    for op in operations:
+        message_id = str(op.get("_id", ""))
+        action = op.get("action", "status")
+        item = {"_id": message_id, "action": action, "ok": True}
+
+        if not ObjectId.is_valid(message_id):
+            item.update(ok=False, error="Invalid message ID")
+        elif message_id in seen:
+            # One operation per message, or its counters would move twice
+            item.update(ok=False, error="Duplicate message ID")
+        elif action == "status" and op.get("status") not in MESSAGE_STATUSES:
+            item.update(ok=False, error="Invalid status")
+        elif action not in ("status", "delete"):
+            item.update(ok=False, error="Unknown action")
+        else:
+            item["status"] = op.get("status")
+            seen.add(message_id)
+        items.append(item)
+
+    valid = [i for i in items if i["ok"]]
+    existing = {
+        str(m["_id"]): m.get("status") for m in mongo.db.message.find(
+            {"_id": {"$in": [ObjectId(i["_id"]) for i in valid]}},
+            {"status": 1}
+        )
+    }
+
+    ops = []
+    changes = {}
+    for index, item in enumerate(items):
+        if not item["ok"]:
+            continue
+        if item["_id"] not in existing:
+            item.update(ok=False, error="Message not found")
+            continue
+
+        query = {"_id": ObjectId(item["_id"])}
+        old_status = existing[item["_id"]]
+        if item["action"] == "delete":
+            ops.append((index, DeleteOne(query)))
+            changes[index] = stats.message_removed(old_status)
+        else:
+            new_status = item.pop("status")
+            ops.append((index, UpdateOne(query, {"$set": {"status": new_status}})))
+            changes[index] = stats.message_moved(old_status, new_status)
+
+    run_bulk(mongo.db.message, items, ops)
+
+    # Statuses were read just before the write; reconcile covers a concurrent edit
+    deltas = Counter()
+    for index, change in changes.items():
+        if items[index]["ok"]:
+            deltas.update(change)
+    stats.apply(mongo.db, deltas)
+    if ops:
+        bump_collection_version("message")
+
+    for item in items:
+        item.pop("status", None)
+
+    succeeded = sum(1 for i in items if i["ok"])
+    return {
+        "message": f"{succeeded} of {len(items)} operations applied",
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": items
+    }, 200
+
+@app.route("/admin/bulk/delete_media", methods=["POST"])
+def bulk_delete_media():
+    """Body: {"ids": [...]}"""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    ids = [str(i) for i in (request.json or {}).get("ids") or []]
+    if not ids:
+        return {"message": "Media IDs required"}, 400
+    if len(ids) > BULK_LIMIT:
+        return {"message": f"At most {BULK_LIMIT} ids per request"}, 400
+
+    items = []
+    seen = set()
+    for media_id in ids:
+        item = {"_id": media_id, "ok": True}
+        if not ObjectId.is_valid(media_id):
+            item.update(ok=False, error="Invalid media ID")
+        elif media_id in seen:
+            item.update(ok=False, error="Duplicate media ID")
+        seen.add(media_id)
+        items.append(item)
+    valid = [ObjectId(item["_id"]) for item in items if item["ok"]]
+    found = {str(m["_id"]): m for m in mongo.db.media.find({"_id": {"$in": valid}})}
+
+    ops = []
+    for index, item in enumerate(items):
+        if not item["ok"]:
+            continue
+        if item["_id"] not in found:
+            item.update(ok=False, error="Media not found")
+            continue
+        ops.append((index, DeleteOne({"_id": ObjectId(item["_id"])})))
+
+    # Documents go first: the remote assets are only destroyed once no media uses them
+    run_bulk(mongo.db.media, items, ops)
+    deleted = [found[item["_id"]] for item in items if item["ok"]]
+    if ops:
+        deltas = Counter()
+        for media in deleted:
+            deltas.update(stats.media_removed(media["file_type"]))
+        stats.apply(mongo.db, deltas)
+        bump_collection_version("media")
+
+    # Group every orphaned remote asset by Cloudinary resource type
+    candidates = dict.fromkeys(asset for media in deleted for asset in assets.remote_assets(media))
+    orphans = assets.unreferenced(mongo.db.media, [public_id for public_id, _ in candidates])
+    by_type = {"image": [], "video": []}
+    for public_id, resource_type in candidates:
+        if public_id in orphans:
+            by_type[resource_type].append(public_id)
+
+    remote = {}
+    for resource_type, public_ids in by_type.items():
+        for start in range(0, len(public_ids), CLOUDINARY_BATCH):
+            batch = public_ids[start:start + CLOUDINARY_BATCH]
+            try:
+                result = cloudinary_delete_resources(batch, resource_type=resource_type)
+                remote.update(result.get("deleted", {}))
+            except Exception as e:
+                print(f"Error deleting from Cloudinary: {e}")
+                remote.update({public_id: "error" for public_id in batch})
+
+    for item in items:
+        if item["ok"]:
+            public_id = found[item["_id"]]["id"]
+            item["cloudinary"] = remote.get(public_id, "unknown") if public_id in orphans else "shared"
+
+    succeeded = sum(1 for i in items if i["ok"])
+    return {
+        "message": f"{succeeded} of {len(items)} media deleted",
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": items
+    }, 200
+
+@app.route("/admin/stats", methods=["GET"])
+def dashboard_stats():
+    """Inbox and media counts, maintained incrementally (see stats.py)."""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    return json_response(stats.read(mongo.db))
+
+@app.route("/admin/stats/reconcile", methods=["POST"])
+def reconcile_stats():
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    return json_response(stats.reconcile(mongo.db))
+
+@app.route("/admin/cache/stats", methods=["GET"])
+def cache_stats():
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    return {"media": media_cache.stats()}, 200
+
+@app.route("/admin/rate-limit/stats", methods=["GET"])
+def rate_limit_stats():
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    return rate_limiter.stats(), 200
+
+#--------------------------------------------------------
+#----------- Profiling ------------------------------
+#--------------------------------------------------------
+
+profiling.init_app(app, lambda: mongo.db.profiles, require_admin_login)
+
+@app.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """Newest profiles first, without their payload. ?endpoint=&limit="""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    limit = min(100, max(1, int(request.args.get("limit", 20))))
+    query = {}
+    if request.args.get("endpoint"):
+        query["endpoint"] = request.args["endpoint"]
+
+    profiles = mongo.db.profiles.find(query, profiling.SUMMARY_PROJECTION) \
+        .sort("created_at", -1) \
+        .limit(limit)
+
+    return {"data": [profiling.summary_row(p) for p in profiles]}, 200
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """?format=collapsed returns the raw collapsed stacks as text/plain."""
+    check_db()
+    if not require_admin_login():
+        return {"message": "unauthorized access"}, 403
+
+    if not ObjectId.is_valid(profile_id):
+        return {"message": "Invalid profile ID"}, 400
+
+    p = mongo.db.profiles.find_one({"_id": ObjectId(profile_id)})
+    if not p:
+        return {"message": "Profile not found"}, 404
+
+    if request.args.get("format") == "collapsed":
+        return app.response_class(p.get("collapsed", ""), mimetype="text/plain")
+
+    row = profiling.summary_row(p)
+    row["report"] = p.get("report", "")
+    row["collapsed"] = p.get("collapsed", "")
+    row["collapsed_units"] = profiling.COLLAPSED_UNITS.get(p.get("mode"))
+    return row, 200
+
+#--------------------------------------------------------
+#----------- Health Checks ------------------------------
+#--------------------------------------------------------
+
+@app.route("/health/live", methods=["GET"])
+def health_live():
+    return {"status": "ok"}, 200
+
+@app.route("/health/ready", methods=["GET"])
+def health_ready():
+    """For the load balancer: ready only while the Mongo circuit is closed."""
+    status = db_manager.status()
+    if status["state"] != "closed" or status["last_probe"] is None:
+        return {"status": "unavailable", "database": status}, 503
+    return {"status": "ready", "database": status}, 200
+
 #--------------------------------------------------------
 #----------- Setup Indexes ------------------------------
 #--------------------------------------------------------
 
+def provision_indexes():
+    try:
+        created, failed = ensure_indexes(mongo.db)
+    except Exception as e:
+        print(f"⚠️ Index setup failed: {e}")
+        return None
+
+    print(f"✅ Indexes ensured: {created}")
+    for collection, error in failed.items():
+        print(f"⚠️ Index setup failed for {collection}: {error}")
+    return None if failed else created
+
+# Off the boot path so an unreachable Mongo doesn't stall worker startup
+if BOOT and os.getenv("AUTO_INDEXES", "1") == "1":
+    threading.Thread(target=provision_indexes, name="ensure-indexes", daemon=True).start()
+
 @app.route("/index", methods=["GET"])
 def setup_indexes():
     check_db()
-    db = mongo.cx.get_database()
-
-    db.message.create_index([("email", 1), ("status", 1)])
-    db.message.create_index([("ip", 1), ("created_at", -1)])
+    if provision_indexes() is None:
+        return "Index setup failed.", 500
 
-    print("Indexes setup completed.")
     return "Indexes setup completed."
 
 #-------------------------------------------------------
 #----------- React Serving Route -----------------------
 #-------------------------------------------------------
 
+static_manifest = build_manifest(app.template_folder)
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_react(path):
-    full_path = os.path.join(app.template_folder, path)
-
     # agar koi actual file hai (js, css, image)
-    if path != "" and os.path.exists(full_path):
+    asset = static_manifest.get(path) if path else None
+    if asset is not None:
+        return serve_asset(asset, request)
+
+    # Files added after startup are not in the manifest yet
+    full_path = os.path.join(app.template_folder, path)
+    if path != "" and os.path.isfile(full_path):
         return send_from_directory(app.template_folder, path)
 
-    # warna React ka index.html
+    # warna React ka index.html (memory se)
+    index = static_manifest.get("index.html")
+    if index is not None:
+        return serve_asset(index, request)
     return send_from_directory(app.template_folder, "index.html")
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""In-memory manifest of the React build directory.
+
+The manifest is built once per worker at startup. It keeps a strong ETag for
+every file, the pre-generated .br/.gz siblings found next to it, and the bytes
+of small text assets (index.html included) so they never touch the disk again.
+
+Run `python static_assets.py frontend/build` after `npm run build` to write the
+.gz (and .br, when the brotli module is installed) variants to disk.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+
+from flask import Response, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".html", ".js", ".css", ".json", ".svg", ".txt", ".map", ".ico")
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+# CRA puts a content hash in every bundle name, e.g. main.96b9dd9e.js
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(chunk\.)?(js|css)(\.map)?$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT_LIVED = "public, max-age=3600"
+REVALIDATE = "no-cache"
+
+# Text assets up to this size are kept in memory, everything else is streamed from disk
+MEMORY_LIMIT = 4 * 1024 * 1024
+
+
+class Asset:
+    def __init__(self, path, etag, cache_control):
+        self.path = path
+        self.etag = etag
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = cache_control
+        self.data = None
+        # encoding → (path on disk or None, bytes or None)
+        self.variants = {}
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+
+def cache_policy(rel_path):
+    if rel_path == "index.html":
+        return REVALIDATE
+    if HASHED_NAME.search(rel_path):
+        return IMMUTABLE
+    return SHORT_LIVED
+
+
+def build_manifest(root):
+    """Walks the build directory and returns {relative path: Asset}."""
+    manifest = {}
+    if not os.path.isdir(root):
+        print(f"⚠️ Build directory not found: {root}")
+        return manifest
+
+    for subdir, _, files in os.walk(root):
+        for name in files:
+            if name.endswith((".br", ".gz")):
+                continue
+
+            full_path = os.path.join(subdir, name)
+            rel_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            asset = Asset(full_path, file_digest(full_path), cache_policy(rel_path))
+
+            size = os.path.getsize(full_path)
+            if size <= MEMORY_LIMIT and name.endswith(COMPRESSIBLE):
+                with open(full_path, "rb") as f:
+                    asset.data = f.read()
+
+            for encoding, suffix in VARIANTS:
+                if os.path.exists(full_path + suffix):
+                    asset.variants[encoding] = (full_path + suffix, None)
+
+            # Small text assets without a gzip sibling are compressed once here
+            if asset.data is not None and "gzip" not in asset.variants:
+                asset.variants["gzip"] = (None, gzip.compress(asset.data, 9))
+
+            manifest[rel_path] = asset
+
+    return manifest
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return f'"{etag}"' in tags
+
+
+def negotiate(asset, accept_encoding, if_none_match):
+    """Framework-neutral core of serve_asset.
+
+    Returns (status, headers, data, path): exactly one of data/path is set for
+    a 200, neither for a 304.
+    """
+    accepted = accepted_encodings(accept_encoding)
+
+    encoding = None
+    for candidate, _ in VARIANTS:
+        if candidate in asset.variants and candidate in accepted:
+            encoding = candidate
+            break
+
+    etag = asset.etag if encoding is None else f"{asset.etag}-{encoding}"
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": asset.cache_control,
+        "Vary": "Accept-Encoding"
+    }
+
+    if etag_matches(if_none_match, etag):
+        return 304, headers, None, None
+
+    if encoding is None:
+        return 200, headers, asset.data, None if asset.data is not None else asset.path
+
+    headers["Content-Encoding"] = encoding
+    variant_path, variant_data = asset.variants[encoding]
+    return 200, headers, variant_data, variant_path
+
+
+def serve_asset(asset, req):
+    """Builds the Flask response for one manifest entry, honouring
+    Accept-Encoding and If-None-Match."""
+    status, headers, data, path = negotiate(
+        asset,
+        req.headers.get("Accept-Encoding"),
+        req.headers.get("If-None-Match")
+    )
+
+    if status == 304:
+        return Response(status=304, headers=headers)
+
+    if data is not None:
+        response = Response(data, mimetype=asset.mimetype)
+    else:
+        response = send_file(path, mimetype=asset.mimetype, conditional=False, etag=False)
+
+    response.headers.update(headers)
+    return response
+
+
+def precompress(root):
+    """Writes .gz and .br siblings for every compressible file under root."""
+    written = 0
+    for subdir, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+
+            full_path = os.path.join(subdir, name)
+            with open(full_path, "rb") as f:
+                data = f.read()
+
+            with open(full_path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, 9))
+            written += 1
+
+            if brotli is not None:
+                with open(full_path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+                written += 1
+
+    print(f"Precompressed {written} files under {root}")
+
+
+if __name__ == "__main__":
+    precompress(sys.argv[1] if len(sys.argv) > 1 else os.path.join("frontend", "build"))
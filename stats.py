@@ -0,0 +1,163 @@
+"""Inbox and media counters for the admin dashboard.
+
+Two small documents in the `stats` collection hold the counts:
+
+    {"_id": "messages", "pending": 3, "responded": 12, "blocked": 1, "other": 0}
+    {"_id": "media", "photo": 20, "video": 4, "other": 0}
+
+Every write path in server.py / asgi.py turns what it changed into deltas and
+applies them with one `$inc` per document, so reading the dashboard never
+counts documents. The counters can drift if a process dies between its write
+and its `$inc` (or on a concurrent bulk edit); `reconcile` rebuilds them from
+a single aggregation. It also runs on the first `read` of an inbox whose
+counters were never reconciled, so they start from the real counts instead
+of from zero:
+
+    python stats.py              # print the counters
+    python stats.py --reconcile  # rebuild them, uses MONGO_URI from config.env
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+
+MESSAGE_STATUSES = ("pending", "responded", "blocked")
+MEDIA_TYPES = ("photo", "video")
+
+
+def message_key(status):
+    return f"messages.{status if status in MESSAGE_STATUSES else 'other'}"
+
+
+def media_key(file_type):
+    return f"media.{file_type if file_type in MEDIA_TYPES else 'other'}"
+
+
+def message_added(status, n=1):
+    return Counter({message_key(status): n})
+
+
+def message_removed(status, n=1):
+    return Counter({message_key(status): -n})
+
+
+def message_moved(old_status, new_status, n=1):
+    deltas = Counter({message_key(old_status): -n})
+    deltas[message_key(new_status)] += n
+    return deltas
+
+
+def media_added(file_type, n=1):
+    return Counter({media_key(file_type): n})
+
+
+def media_removed(file_type, n=1):
+    return Counter({media_key(file_type): -n})
+
+
+def updates(deltas):
+    """[(document id, update)] for the non-zero deltas, one per stats document."""
+    by_doc = {}
+    for key, n in deltas.items():
+        if n:
+            doc_id, field = key.split(".", 1)
+            by_doc.setdefault(doc_id, {})[field] = n
+
+    now = datetime.utcnow()
+    return [
+        (doc_id, {"$inc": inc, "$set": {"updated_at": now}})
+        for doc_id, inc in by_doc.items()
+    ]
+
+
+def apply(db, deltas):
+    """Best effort: a failed $inc is logged, the request it belongs to has
+    already succeeded and reconcile repairs the count."""
+    for doc_id, update in updates(deltas):
+        try:
+            db.stats.update_one({"_id": doc_id}, update, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Stats update failed for {doc_id}: {e}")
+
+
+async def apply_async(db, deltas):
+    """Motor twin of apply, for asgi.py."""
+    for doc_id, update in updates(deltas):
+        try:
+            await db.stats.update_one({"_id": doc_id}, update, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Stats update failed for {doc_id}: {e}")
+
+
+def read(db, bootstrap=True):
+    """Current counters. With `bootstrap`, counters that were never reconciled
+    (a fresh deploy on an existing inbox) are rebuilt first."""
+    counters = {
+        "messages": {status: 0 for status in MESSAGE_STATUSES + ("other",)},
+        "media": {file_type: 0 for file_type in MEDIA_TYPES + ("other",)}
+    }
+    docs = list(db.stats.find({"_id": {"$in": list(counters)}}))
+    if bootstrap and (len(docs) < len(counters) or not all(doc.get("reconciled_at") for doc in docs)):
+        return reconcile(db)
+
+    updated_at = None
+    for doc in docs:
+        for field, value in doc.items():
+            if field in counters[doc["_id"]]:
+                counters[doc["_id"]][field] = value
+        if doc.get("updated_at") and (updated_at is None or doc["updated_at"] > updated_at):
+            updated_at = doc["updated_at"]
+
+    counters["messages"]["total"] = sum(counters["messages"].values())
+    counters["media"]["total"] = sum(counters["media"].values())
+    counters["updated_at"] = updated_at
+    return counters
+
+
+def reconcile(db):
+    """Recounts both collections in one aggregation and overwrites the counters.
+    Writes that land while it runs can be off by one until the next run."""
+    pipeline = [
+        {"$group": {"_id": {"doc": "messages", "key": "$status"}, "n": {"$sum": 1}}},
+        {"$unionWith": {"coll": "media", "pipeline": [
+            {"$group": {"_id": {"doc": "media", "key": "$file_type"}, "n": {"$sum": 1}}}
+        ]}}
+    ]
+
+    counts = Counter()
+    for row in db.message.aggregate(pipeline):
+        key = row["_id"]["key"]
+        counts[message_key(key) if row["_id"]["doc"] == "messages" else media_key(key)] += row["n"]
+
+    now = datetime.utcnow()
+    for doc_id, fields in (("messages", MESSAGE_STATUSES), ("media", MEDIA_TYPES)):
+        values = {field: counts[f"{doc_id}.{field}"] for field in fields + ("other",)}
+        db.stats.update_one(
+            {"_id": doc_id},
+            {"$set": {**values, "updated_at": now, "reconciled_at": now}},
+            upsert=True
+        )
+    return read(db, bootstrap=False)
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Show or rebuild the admin dashboard counters.")
+    parser.add_argument("--reconcile", action="store_true", help="recount from the collections")
+    args = parser.parse_args()
+
+    load_dotenv("config.env")
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+
+    counters = reconcile(db) if args.reconcile else read(db)
+    for group in ("messages", "media"):
+        print(f"{group}: " + ", ".join(f"{k}={v}" for k, v in counters[group].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Background processing for admin uploads.
+
+The request thread only spools the raw files to disk and records a job in
+Mongo; a bounded thread pool then runs the handler (optimize, Cloudinary
+upload, Mongo insert). Job state lives in Mongo so any gunicorn worker can
+report status or retry a failed job, as long as they share the spool dir.
+
+A job only runs in the process that accepted it. While it is queued or
+running that process refreshes its updated_at every HEARTBEAT seconds, so a
+job whose updated_at stops moving belongs to a dead worker; recover_stale()
+(run at boot) marks those failed so they can be retried. A job is only ever
+claimed out of "queued", so a recovered copy and a late original can't both
+run.
+
+Spooled files are kept while a retry might need them: they go once the job
+is done, fails with one of `permanent_errors`, runs out of attempts, or
+stays failed longer than `keep_failed` seconds.
+"""
+
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+
+class QueueFull(Exception):
+    pass
+
+
+HEARTBEAT = 30
+MAX_ATTEMPTS = 3
+
+
+class UploadJobQueue:
+
+    def __init__(self, get_collection, handler, spool_dir, max_workers=2, max_pending=16,
+                 permanent_errors=(), keep_failed=7 * 24 * 3600):
+        self.get_collection = get_collection
+        self.handler = handler
+        self.spool_dir = spool_dir
+        self.permanent_errors = tuple(permanent_errors)
+        self.keep_failed = keep_failed
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        # Running + waiting jobs, so a burst of uploads can't pile up unbounded
+        self.slots = threading.BoundedSemaphore(max_pending)
+        # Jobs this process is responsible for, kept alive by the heartbeat
+        self.active = set()
+        self.active_lock = threading.Lock()
+        self.heartbeat = None
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def _track(self, job_id):
+        with self.active_lock:
+            self.active.add(job_id)
+            if self.heartbeat is None:
+                self.heartbeat = threading.Thread(target=self._beat, name="upload-heartbeat", daemon=True)
+                self.heartbeat.start()
+
+    def _untrack(self, job_id):
+        with self.active_lock:
+            self.active.discard(job_id)
+
+    def _beat(self):
+        while True:
+            time.sleep(HEARTBEAT)
+            with self.active_lock:
+                job_ids = list(self.active)
+            if not job_ids:
+                continue
+            try:
+                self.get_collection().update_many(
+                    {"_id": {"$in": job_ids}, "status": {"$in": ["queued", "running"]}},
+                    {"$set": {"updated_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                print(f"Upload job heartbeat failed: {e}")
+
+    def submit(self, fields, files):
+        """Spools `files` ({name: FileStorage}) and queues a job. Returns its id."""
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull()
+
+        try:
+            job_id = uuid.uuid4().hex
+            job_dir = os.path.join(self.spool_dir, job_id)
+            os.makedirs(job_dir)
+
+            spooled = {}
+            for name, storage in files.items():
+                if storage:
+                    path = os.path.join(job_dir, name)
+                    storage.save(path)
+                    spooled[name] = path
+
+            self.get_collection().insert_one({
+                "_id": job_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0,
+                "fields": fields,
+                "files": spooled,
+                "attempts": 0,
+                "error": None,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            })
+        except Exception:
+            self.slots.release()
+            raise
+
+        self._track(job_id)
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def retry(self, job_id):
+        """Re-queues a failed job. Returns False if it is not in a retriable failed state."""
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull()
+
+        job = self.get_collection().find_one_and_update(
+            {"_id": job_id, "status": "failed", "retriable": {"$ne": False}},
+            {"$set": {"status": "queued", "stage": "queued", "progress": 0,
+                      "error": None, "updated_at": datetime.utcnow()}}
+        )
+        if job is None:
+            self.slots.release()
+            return False
+
+        self._track(job_id)
+        self.executor.submit(self._run, job_id)
+        return True
+
+    def recover_stale(self, stale_after=4 * HEARTBEAT):
+        """Marks queued/running jobs whose worker stopped heartbeating for
+        `stale_after` seconds as failed, and drops the spooled files of jobs
+        that stayed failed longer than keep_failed. Returns how many jobs were
+        marked failed."""
+        coll = self.get_collection()
+        now = datetime.utcnow()
+        recovered = coll.update_many(
+            {"status": {"$in": ["queued", "running"]}, "updated_at": {"$lt": now - timedelta(seconds=stale_after)}},
+            {"$set": {"status": "failed", "error": "Interrupted by a server restart", "updated_at": now}}
+        ).modified_count
+
+        expired = coll.find(
+            {"status": "failed", "retriable": {"$ne": False},
+             "updated_at": {"$lt": now - timedelta(seconds=self.keep_failed)}},
+            {"_id": 1}
+        )
+        for job in expired:
+            self._give_up(job["_id"])
+        return recovered
+
+    def status(self, job_id):
+        return self.get_collection().find_one({"_id": job_id}, {"fields": 0, "files": 0})
+
+    def update(self, job_id, **changes):
+        changes["updated_at"] = datetime.utcnow()
+        self.get_collection().update_one({"_id": job_id}, {"$set": changes})
+
+    def progress(self, job_id, stage, percent):
+        self.update(job_id, stage=stage, progress=percent)
+
+    def _give_up(self, job_id):
+        """No retry will need the raw files any more."""
+        self.get_collection().update_one({"_id": job_id}, {"$set": {"retriable": False}})
+        shutil.rmtree(os.path.join(self.spool_dir, job_id), ignore_errors=True)
+
+    def _run(self, job_id):
+        job = None
+        try:
+            # Only a queued job can be claimed: a copy that was recovered and
+            # retried elsewhere (or already claimed) is left alone
+            job = self.get_collection().find_one_and_update(
+                {"_id": job_id, "status": "queued"},
+                {"$set": {"status": "running", "updated_at": datetime.utcnow()},
+                 "$inc": {"attempts": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return
+
+            result = self.handler(job, lambda stage, percent: self.progress(job_id, stage, percent))
+            self.update(job_id, status="done", stage="done", progress=100, result=result)
+
+            # Raw files are only kept around while a retry might need them
+            shutil.rmtree(os.path.join(self.spool_dir, job_id), ignore_errors=True)
+        except Exception as e:
+            print(f"Upload job {job_id} failed: {e}")
+            traceback.print_exc()
+            try:
+                self.update(job_id, status="failed", error=str(e))
+                if isinstance(e, self.permanent_errors) or (job and job["attempts"] >= MAX_ATTEMPTS):
+                    self._give_up(job_id)
+            except Exception as db_error:
+                print(f"Failed to record upload job failure: {db_error}")
+        finally:
+            self._untrack(job_id)
+            self.slots.release()